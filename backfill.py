@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def format_duration(seconds: float) -> str:
+    """Formats a number of seconds as H:MM:SS."""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class CatchUp:
+    """
+    Drains the log files that were never ingested or were left behind their end of file.
+
+    Files are found with find_unfinished(source) and drained with drain(source, filename, filepath)
+    on a small pool of its own, separate from the live tail, so today's files keep priority.
+    Progress and ETA are reported in bytes as files complete.
+    """
+
+    def __init__(self, find_unfinished, drain, max_workers: int = 1, report_interval: float = 30.0):
+        """
+        Args:
+            find_unfinished: Callable returning [(filename, filepath, remaining_bytes), ...] for a source.
+            drain: Callable reading a file of a source up to its end and marking it done.
+            max_workers (int): Number of files drained at the same time.
+            report_interval (float): Minimum number of seconds between two progress reports.
+        """
+        self.find_unfinished = find_unfinished
+        self.drain = drain
+        self.max_workers = max_workers
+        self.report_interval = report_interval
+
+    def run(self, sources) -> None:
+        """Finds and drains the unfinished files of all sources, then returns."""
+        work = []
+        for source in sources:
+            try:
+                work.extend((source, filename, filepath, remaining)
+                            for filename, filepath, remaining in self.find_unfinished(source))
+            except Exception as e:
+                print(f"[{source.server_name}] Catch-up: error listing unfinished files: {e}")
+        if not work:
+            return
+
+        total_files = len(work)
+        total_bytes = sum(remaining for _, _, _, remaining in work)
+        print(f"Catch-up: {total_files} unfinished file(s), {total_bytes / 1048576:.1f} MB to read")
+
+        done_files = 0
+        done_bytes = 0
+        failed_files = 0
+        started = time.monotonic()
+        last_report = started
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="catch-up") as pool:
+            futures = {pool.submit(self.drain, source, filename, filepath): (source, filename, remaining)
+                       for source, filename, filepath, remaining in work}
+            for future in as_completed(futures):
+                source, filename, remaining = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed_files += 1
+                    print(f"[{source.server_name}] Catch-up: error draining {filename}: {e}")
+                done_files += 1
+                done_bytes += remaining
+
+                now = time.monotonic()
+                if now - last_report >= self.report_interval or done_files == total_files:
+                    last_report = now
+                    self.report(done_files, total_files, done_bytes, total_bytes, now - started)
+
+        if failed_files:
+            print(f"Catch-up: {failed_files} file(s) failed and will be retried on the next catch-up.")
+
+    @staticmethod
+    def report(done_files: int, total_files: int, done_bytes: int, total_bytes: int, elapsed: float) -> None:
+        percent = 100.0 * done_bytes / total_bytes if total_bytes else 100.0
+        eta = "--"
+        if 0 < done_bytes < total_bytes:
+            eta = format_duration(elapsed * (total_bytes - done_bytes) / done_bytes)
+        print(f"Catch-up: {done_files}/{total_files} files, {done_bytes / 1048576:.1f}/{total_bytes / 1048576:.1f} MB "
+              f"({percent:.0f}%), elapsed {format_duration(elapsed)}, ETA {eta}")
+
+    def start(self, sources, interval: float = 0) -> threading.Thread:
+        """
+        Runs the catch-up in a background thread, once or every `interval` seconds.
+        """
+        def loop():
+            while True:
+                self.run(sources)
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="catch-up", daemon=True)
+        thread.start()
+        return thread
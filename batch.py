@@ -0,0 +1,122 @@
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+from file_handling import LogTail, compressionOf
+from parallel_parse import parallel_parse_tail
+from parse_log_entries import iter_parse_entries
+from profiling import CycleProfiler
+from search_store import SearchStore
+from sinks import MongoSink, NdjsonSink
+from split_entries import iter_split_entries
+
+
+def parse_file(input_log_filepath, sink, server_name: str = "US", workers: int = 1,
+               max_entry_size=None) -> tuple[int, int]:
+    """
+    Parses a whole log file (plain or compressed) into a sink.
+
+    Args:
+        input_log_filepath (str): The log file.
+        sink (Sink): Where the parsed entries are written.
+        server_name (str): The name of the server to associate with each log entry.
+        workers (int): Worker processes parsing entry-aligned chunks of a plain file, 1 to parse inline.
+        max_entry_size (int | None): Maximum number of characters kept for a single entry.
+
+    Returns:
+        tuple[int, int]: The number of lines read and of entries written.
+    """
+    # The end offset only bounds plain files; archives are read to their end
+    end_offset = sys.maxsize if compressionOf(input_log_filepath) else os.path.getsize(input_log_filepath)
+    tail = LogTail(input_log_filepath, 0, end_offset)
+    if workers > 1 and not tail.compressed:
+        # LogRecords are cheaper to send back from the workers
+        entries = parallel_parse_tail(tail, server_name, workers, max_entry_size=max_entry_size, compact=True)
+    else:
+        entries = iter_parse_entries(iter_split_entries(tail, max_entry_size), server_name)
+    written = sink.write_all(entries)
+    return tail.lines_read, written
+
+
+def open_sink(args):
+    """Returns the sink selected on the command line."""
+    if args.sink == "mongo":
+        uri = args.mongo or os.getenv("MONGO")
+        if not uri:
+            raise SystemExit("--sink mongo needs --mongo or the MONGO environment variable")
+        return MongoSink(uri, args.database, args.collection)
+    if args.sink == "sqlite":
+        if args.output == "-":
+            raise SystemExit("--sink sqlite needs -o with the path of the database")
+        return SearchStore(args.output)
+    return NdjsonSink(args.output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="One-shot batch parsing of error log files, without the daemon.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser("parse", help="Parse log files into a sink")
+    parse_parser.add_argument("files", nargs="+", help="errors_YYYY-MM-DD.log files, plain or compressed")
+    parse_parser.add_argument("--sink", default="ndjson", choices=["ndjson", "mongo", "sqlite"])
+    parse_parser.add_argument("-o", "--output", default="-", help="NDJSON output file (- for stdout) or SQLite database")
+    parse_parser.add_argument("--workers", type=int, default=1, help="Worker processes per file")
+    parse_parser.add_argument("--server", default="US", help="Server name stored with the entries")
+    parse_parser.add_argument("--max-entry-size", type=int, default=1048576, help="0 for no cap")
+    parse_parser.add_argument("--mongo", help="MongoDB URI for --sink mongo, defaults to $MONGO")
+    parse_parser.add_argument("--database", default="LogParser")
+    parse_parser.add_argument("--collection", default="LogEntries")
+    parse_parser.add_argument("--profile", metavar="DIR", help="Write a cProfile report of each file to DIR")
+    parse_parser.add_argument("--profile-memory", action=argparse.BooleanOptionalAction, default=False,
+                              help="Trace allocations in the profile (slower)")
+
+    query_parser = subparsers.add_parser("query", help="Search a SQLite store written with --sink sqlite")
+    query_parser.add_argument("database", help="SQLite database")
+    query_parser.add_argument("--error-code")
+    query_parser.add_argument("--url", help="URL prefix")
+    query_parser.add_argument("--user")
+    query_parser.add_argument("--remote-host")
+    query_parser.add_argument("--controller")
+    query_parser.add_argument("--action")
+    query_parser.add_argument("--server")
+    query_parser.add_argument("--since", help="ServerDateTime lower bound, e.g. \"2025-01-01 12:00\"")
+    query_parser.add_argument("--until", help="ServerDateTime upper bound (exclusive)")
+    query_parser.add_argument("--trace", help="Full-text query on the stack trace")
+    query_parser.add_argument("--limit", type=int, default=50)
+    query_parser.add_argument("--json", action="store_true", help="Print the entries as NDJSON")
+
+    args = parser.parse_args()
+    if args.command == "parse":
+        total_entries = 0
+        profiler = CycleProfiler(args.profile, keep=sys.maxsize, trace_memory=args.profile_memory) if args.profile else None
+        with open_sink(args) as sink:
+            for input_log_filepath in args.files:
+                started = time.perf_counter()
+                with profiler.profile(os.path.basename(input_log_filepath)) if profiler is not None else nullcontext():
+                    lines, entries = parse_file(input_log_filepath, sink, args.server, args.workers,
+                                                args.max_entry_size or None)
+                seconds = time.perf_counter() - started
+                total_entries += entries
+                # Progress goes to stderr, stdout may be the NDJSON output
+                print(f"{input_log_filepath}: {lines} lines, {entries} entries in {seconds:.1f}s "
+                      f"({os.path.getsize(input_log_filepath) / 1048576 / seconds:.1f} MB/s)", file=sys.stderr)
+        print(f"{total_entries} entries from {len(args.files)} file(s)", file=sys.stderr)
+    elif args.command == "query":
+        if not os.path.exists(args.database):
+            raise SystemExit(f"{args.database} does not exist")
+        started = time.perf_counter()
+        with SearchStore(args.database) as store:
+            results = store.search(error_code=args.error_code, url=args.url, user=args.user, remote_host=args.remote_host,
+                                   controller=args.controller, action=args.action, server=args.server,
+                                   since=args.since, until=args.until, stack_trace=args.trace, limit=args.limit)
+        if args.json:
+            with NdjsonSink("-") as output:
+                output.write_all(results)
+        else:
+            for document in results:
+                print(f"{document.get('ServerDateTime')}  {document.get('ErrorCode')}  {document.get('Server')}  "
+                      f"{document.get('HTTPStatusCode')}  {document.get('Controller')}/{document.get('Action')}  "
+                      f"{document.get('User')}  {document.get('URL')}")
+        print(f"{len(results)} entries in {(time.perf_counter() - started) * 1000:.1f}ms", file=sys.stderr)
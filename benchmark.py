@@ -0,0 +1,346 @@
+import argparse
+import datetime
+import gc
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from file_handling import LogTail, checkNewLines
+from generate_logs import generate_log_file
+from log_record import LogRecord
+from parse_log_entries import iter_parse_entries, parse_log_entry
+from split_entries import iter_split_entries, split_entries
+
+
+def sample_entry(rnd: random.Random) -> str:
+    """Builds one realistic log entry string: few distinct controllers, unique GUIDs and URLs."""
+    controller = rnd.choice(["Home", "Account", "Orders", "Reports", "Api"])
+    return "\n".join([
+        f"2025-01-01 {rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}.{rnd.randint(0, 9999):04d} "
+        f"ERROR Guid {uuid.UUID(int=rnd.getrandbits(128))}",
+        f"HTTP ERROR {rnd.choice([500, 500, 500, 404, 403])}",
+        f"UTC Date: 1/1/2025 {rnd.randint(1, 12)}:{rnd.randint(0, 59):02d}:00 PM",
+        f"Controller: {controller}",
+        f"Action: {rnd.choice(['Index', 'Details', 'Edit', 'Export'])}",
+        f"URL: https://app.example.com/{controller}/{rnd.randint(1, 10 ** 6)}",
+        f"Remote host: 10.0.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}",
+        f"User: user{rnd.randint(1, 500)}",
+        f"User agent: {rnd.choice(['Mozilla/5.0 (Windows NT 10.0; Win64; x64)', 'Mozilla/5.0 (Macintosh)'])}",
+        "Exception: System.NullReferenceException: Object reference not set to an instance of an object.",
+        f"   at App.Controllers.{controller}Controller.Index() in C:\\src\\App\\{controller}Controller.cs:line {rnd.randint(1, 900)}",
+        "Headers",
+        "Host: app.example.com",
+        "Referer: https://app.example.com/",
+    ]) + "\n"
+
+
+def measure(build) -> tuple[int, object]:
+    """Returns the memory (bytes) still allocated by the object build() returns, and the object."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def bench_records(entries: int, seed: int = 0) -> None:
+    """Compares the memory held by parsed entries as dicts and as compact LogRecords."""
+    rnd = random.Random(seed)
+    entry_strings = [sample_entry(rnd) for _ in range(entries)]
+
+    dict_bytes, dicts = measure(lambda: [parse_log_entry(entry, "US") for entry in entry_strings])
+    del dicts
+    record_bytes, records = measure(lambda: [LogRecord.from_dict(parse_log_entry(entry, "US")) for entry in entry_strings])
+    del records
+
+    per_100k = 100000 / entries
+    print(f"Parsed entries held in memory ({entries} entries):")
+    print(f"  dict:      {dict_bytes / 1048576:8.1f} MB  ({dict_bytes * per_100k / 1048576:.1f} MB per 100k)")
+    print(f"  LogRecord: {record_bytes / 1048576:8.1f} MB  ({record_bytes * per_100k / 1048576:.1f} MB per 100k)")
+    print(f"  saved:     {(dict_bytes - record_bytes) * per_100k / 1048576:8.1f} MB per 100k entries "
+          f"({100.0 * (dict_bytes - record_bytes) / dict_bytes:.0f}%)")
+
+
+class MemoryCollection:
+    """
+    In-memory stand-in for the pymongo collections main.py uses.
+
+    Supports the FileInfo queries (equality and {"$exists": False}, $set updates, upserts)
+    and counts the log entries of bulk writes without keeping them, so the end-to-end
+    benchmark measures the ingestion path and not a database.
+    """
+
+    def __init__(self):
+        self.documents = []
+        self.inserted = 0
+
+    @staticmethod
+    def _matches(document: dict, query: dict) -> bool:
+        for key, value in query.items():
+            if isinstance(value, dict) and "$exists" in value:
+                if (key in document) != value["$exists"]:
+                    return False
+            elif document.get(key) != value:
+                return False
+        return True
+
+    def find_one(self, query: dict):
+        return next((dict(document) for document in self.documents if self._matches(document, query)), None)
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query: dict, update: dict):
+        return self._update(query, update, upsert=False, many=True)
+
+    def _update(self, query: dict, update: dict, upsert: bool, many: bool):
+        matched = [document for document in self.documents if self._matches(document, query)]
+        if not many:
+            matched = matched[:1]
+        for document in matched:
+            document.update(update.get("$set", {}))
+        upserted_id = None
+        if not matched and upsert:
+            upserted_id = len(self.documents) + 1
+            self.documents.append({**query, **update.get("$set", {}), "_id": upserted_id})
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched), upserted_id=upserted_id)
+
+    def create_index(self, *args, **kwargs):
+        return None
+
+    def bulk_write(self, requests, ordered: bool = True):
+        self.inserted += len(requests)
+        return SimpleNamespace(inserted_count=len(requests))
+
+
+class MemoryClient:
+    """client[database][collection] access to MemoryCollections."""
+
+    def __init__(self):
+        self.databases = {}
+
+    def __getitem__(self, database_name: str):
+        return self.databases.setdefault(database_name, _MemoryDatabase())
+
+
+class _MemoryDatabase(dict):
+    def __missing__(self, collection_name: str):
+        self[collection_name] = MemoryCollection()
+        return self[collection_name]
+
+
+def peak_rss_mb() -> float:
+    """Returns the peak resident set size of the current process, in MB."""
+    try:
+        import resource
+    except ImportError:
+        # Windows: the peak working set, through psutil
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1048576
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1048576 if sys.platform == "darwin" else peak / 1024
+
+
+def read_lines(log_file) -> list[str]:
+    """Reads a whole log file the way the live tail does (CRLF normalized, utf-8 with replacement)."""
+    return list(LogTail(log_file, 0, os.path.getsize(log_file)))
+
+
+def stage_check_new_lines(log_file, sink):
+    # The poll used to re-read the whole file every cycle
+    started = time.perf_counter()
+    haveNewLines, lines, line_count = checkNewLines(log_file, 0)
+    return line_count or 0, 0, time.perf_counter() - started
+
+
+def stage_tail(log_file, sink):
+    started = time.perf_counter()
+    line_count = sum(1 for _ in LogTail(log_file, 0, os.path.getsize(log_file)))
+    return line_count, 0, time.perf_counter() - started
+
+
+def stage_split_entries(log_file, sink):
+    lines = read_lines(log_file)
+    started = time.perf_counter()
+    entries = split_entries(lines, 0)
+    return len(lines), len(entries), time.perf_counter() - started
+
+
+def stage_iter_split_entries(log_file, sink):
+    lines = read_lines(log_file)
+    started = time.perf_counter()
+    entry_count = sum(1 for _ in iter_split_entries(lines))
+    return len(lines), entry_count, time.perf_counter() - started
+
+
+def stage_parse(log_file, sink):
+    lines = read_lines(log_file)
+    entries = list(iter_split_entries(lines))
+    started = time.perf_counter()
+    entry_count = sum(1 for _ in iter_parse_entries(entries, "BENCH"))
+    return len(lines), entry_count, time.perf_counter() - started
+
+
+def stage_end_to_end(log_file, sink):
+    # One main_program cycle over the whole file: tail, split, parse, batch and write, checkpoint
+    import main
+    from sources import Source
+
+    folder = tempfile.mkdtemp(prefix="errorlogparser-bench-")
+    try:
+        shutil.copyfile(log_file, os.path.join(folder, f"errors_{datetime.date.today():%Y-%m-%d}.log"))
+        if sink == "mongomock":
+            import mongomock
+            main.client = mongomock.MongoClient()
+        else:
+            main.client = MemoryClient()
+        main.DATABASE_NAME = "LogParser"
+        main.FILE_COLLECTION = "FileInfo"
+        main.LOG_COLLECTION_NAME = "LogEntries"
+        main.MAX_ENTRY_SIZE = 1048576
+        main.BATCH_SIZE = 1000
+        main.WRITE_RETRIES = 0
+        main.TRACE_STORE = None
+        main.ROLLUP = None
+        main.SPOOL = None
+        main.SEARCH_STORE = None
+        main.PIPELINE = None
+        main.STORM_CONTROL = None
+        main.OPEN_ENTRY_TIMEOUT = 0
+        main.METRICS = None
+        main.CHECKPOINT_CACHE = None
+        main.COMPACT_RECORDS = False
+        main.PARSE_WORKERS = 1
+        main.PARALLEL_THRESHOLD = 64 * 1024 * 1024
+
+        source = Source(folder, "BENCH")
+        source.writer = main.new_log_writer()
+        started = time.perf_counter()
+        main.main_program(source)
+        seconds = time.perf_counter() - started
+
+        file_info = main.check_file(source.current_file_name, "BENCH")
+        return int(file_info["Lastlineread"]), source.writer.written, seconds
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+STAGES = {
+    "checkNewLines": stage_check_new_lines,
+    "tail": stage_tail,
+    "split_entries": stage_split_entries,
+    "iter_split_entries": stage_iter_split_entries,
+    "parse": stage_parse,
+    "end_to_end": stage_end_to_end,
+}
+
+
+def run_stage(name: str, log_file, sink: str) -> dict:
+    """Runs one stage and returns its counts, timing and the peak RSS of the process. Runs in a child process."""
+    lines, entries, seconds = STAGES[name](log_file, sink)
+    return {"lines": lines, "entries": entries, "seconds": seconds, "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_pipeline(log_file, sink: str = "memory", stages=None, output=None,
+                   baseline=None, tolerance: float = 0.2) -> bool:
+    """
+    Per-stage and end-to-end benchmark of the ingestion path on one log file.
+
+    Each stage runs in a fresh process, so the reported peak RSS belongs to that stage alone
+    (it includes the input the stage is given, e.g. the lines handed to the splitter).
+
+    Args:
+        log_file (str): The errors_YYYY-MM-DD.log file to ingest.
+        sink (str): "memory" (MemoryClient) or "mongomock" for the end-to-end stage.
+        stages (list[str] | None): Names of the stages to run, all of STAGES by default.
+        output (str | None): JSON file the results are written to.
+        baseline (str | None): JSON file of a previous run to compare throughput against.
+        tolerance (float): Allowed throughput drop compared to the baseline, 0.2 for 20%.
+
+    Returns:
+        bool: False if a stage is slower than the baseline by more than the tolerance.
+    """
+    size = os.path.getsize(log_file)
+    print(f"{log_file}: {size / 1048576:.1f} MB, sink {sink}")
+    print(f"  {'stage':20} {'lines/s':>12} {'entries/s':>12} {'MB/s':>8} {'seconds':>8} {'peak RSS':>10}")
+
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    for name in stages or STAGES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            result = pool.submit(run_stage, name, log_file, sink).result()
+        seconds = result["seconds"] or 1e-9
+        result["lines_per_s"] = result["lines"] / seconds
+        result["entries_per_s"] = result["entries"] / seconds
+        results[name] = result
+        print(f"  {name:20} {result['lines_per_s']:12.0f} {result['entries_per_s']:12.0f} "
+              f"{size / 1048576 / seconds:8.1f} {seconds:8.2f} {result['peak_rss_mb']:8.1f} MB")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({"log_file": str(log_file), "bytes": size, "sink": sink, "stages": results}, f, indent=2)
+
+    ok = True
+    if baseline:
+        with open(baseline, 'r', encoding='utf-8') as f:
+            previous_run = json.load(f)
+        if previous_run.get("sink") != sink:
+            print(f"  note: the baseline used sink {previous_run.get('sink')}")
+        previous = previous_run["stages"]
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            # Throughput per line, so baselines taken on another file size stay comparable
+            before, after = previous[name]["lines_per_s"], result["lines_per_s"]
+            change = (after - before) / before if before else 0.0
+            regressed = change < -tolerance
+            ok = ok and not regressed
+            print(f"  {name:20} {change:+8.1%} vs baseline{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks for the log ingestion path.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    records_parser = subparsers.add_parser("records", help="Memory of parsed entries: dict vs compact LogRecord")
+    records_parser.add_argument("--entries", type=int, default=100000)
+    records_parser.add_argument("--seed", type=int, default=0)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Per-stage and end-to-end throughput and peak RSS")
+    pipeline_parser.add_argument("--log", dest="log_file", help="Log file to ingest, generated if omitted")
+    pipeline_parser.add_argument("--size-mb", type=float, default=50, help="Size of the generated log file")
+    pipeline_parser.add_argument("--skew", type=float, default=0.5, help="Share of generated entries hitting the same hot error")
+    pipeline_parser.add_argument("--seed", type=int, default=0)
+    pipeline_parser.add_argument("--sink", default="memory", choices=["memory", "mongomock"])
+    pipeline_parser.add_argument("--stage", dest="stages", action="append", choices=list(STAGES),
+                                 help="Stage to run, can be repeated (all stages by default)")
+    pipeline_parser.add_argument("--json", dest="output", help="Write the results to this JSON file")
+    pipeline_parser.add_argument("--baseline", help="JSON results of a previous run; exit 1 on a regression")
+    pipeline_parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop vs the baseline")
+
+    args = parser.parse_args()
+    if args.benchmark == "records":
+        bench_records(args.entries, args.seed)
+    elif args.benchmark == "pipeline":
+        with tempfile.TemporaryDirectory(prefix="errorlogparser-bench-") as folder:
+            log_file = args.log_file
+            if not log_file:
+                today = datetime.date.today()
+                log_file = os.path.join(folder, f"errors_{today:%Y-%m-%d}.log")
+                generate_log_file(log_file, today, size_bytes=int(args.size_mb * 1048576), skew=args.skew, seed=args.seed)
+            if not bench_pipeline(log_file, args.sink, args.stages, args.output, args.baseline, args.tolerance):
+                raise SystemExit(1)
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from pymongo import UpdateOne
+
+
+class CheckpointCache:
+    """
+    In-process copy of the FileInfo documents, with write-behind checkpoint updates.
+
+    A document is read from Mongo once, then served from memory: the daemon is the only writer
+    of FileInfo, so its copy stays current. Updates change the copy and are queued; with a
+    flush interval they are coalesced (one $set per file, whatever the number of cycles) and
+    sent every flush_interval seconds, otherwise they are sent right away. A cycle that finds
+    nothing new makes no round trip either way.
+
+    With write-behind, a crash loses the checkpoints of the last flush interval: those lines are
+    ingested again on restart (use the spool, SPOOL_PATH, to make that replay idempotent).
+    """
+
+    def __init__(self, collection, flush_interval: float = 0.0):
+        """
+        Args:
+            collection: The FileInfo pymongo collection.
+            flush_interval (float): Seconds between two flushes of the queued updates, 0 to write through.
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.documents = {}
+        self.dirty = {}
+        self.lock = threading.Lock()
+
+    def get(self, server_name: str, filename: str) -> dict | None:
+        """Returns a copy of the FileInfo document of a file, read from Mongo on the first call only."""
+        key = (server_name, filename)
+        with self.lock:
+            document = self.documents.get(key)
+        if document is None:
+            document = self.collection.find_one({"Server": server_name, "Filename": filename})
+            if document is None:
+                return None
+            with self.lock:
+                document = self.documents.setdefault(key, document)
+        return dict(document)
+
+    def put(self, server_name: str, filename: str, document: dict) -> None:
+        """Caches a document that was just written to Mongo."""
+        with self.lock:
+            self.documents[(server_name, filename)] = dict(document)
+
+    def update(self, server_name: str, filename: str, fields: dict) -> bool:
+        """
+        Updates the cached document and queues the update for Mongo.
+
+        Returns:
+            bool: False if the file has no FileInfo document.
+        """
+        if self.get(server_name, filename) is None:
+            return False
+        key = (server_name, filename)
+        with self.lock:
+            self.documents[key].update(fields)
+            self.dirty.setdefault(key, {}).update(fields)
+        if self.flush_interval <= 0:
+            self.flush()
+        return True
+
+    def forget(self, server_name: str, filename: str) -> None:
+        """Drops a document changed in Mongo by someone else, so it is read again."""
+        with self.lock:
+            self.documents.pop((server_name, filename), None)
+            self.dirty.pop((server_name, filename), None)
+
+    def flush(self) -> None:
+        """Sends the queued updates as one unordered bulk write. On failure they are kept for the next flush."""
+        with self.lock:
+            dirty, self.dirty = self.dirty, {}
+        if not dirty:
+            return
+
+        requests = [UpdateOne({"Server": server_name, "Filename": filename}, {"$set": fields})
+                    for (server_name, filename), fields in dirty.items()]
+        try:
+            self.collection.bulk_write(requests, ordered=False)
+        except Exception as e:
+            print(f"Error writing {len(requests)} FileInfo checkpoint(s), retrying on the next flush: {e}")
+            with self.lock:
+                for key, fields in dirty.items():
+                    # Updates queued meanwhile are newer
+                    self.dirty[key] = {**fields, **self.dirty.get(key, {})}
+
+    def start(self) -> threading.Thread:
+        """Flushes the queued updates every flush_interval seconds in a background thread."""
+        def loop():
+            while True:
+                time.sleep(self.flush_interval)
+                self.flush()
+
+        thread = threading.Thread(target=loop, name="checkpoint-flush", daemon=True)
+        thread.start()
+        return thread
@@ -1,5 +1,68 @@
+import bz2
+import gzip
+import io
 import re
 import os
+import sys
+import time
+
+try:
+    # Python 3.14+
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+
+def openZstd(input_log_filepath, mode='rb'):
+    """Opens a .zst file for streaming decompression, with the standard library module or zstandard."""
+    if hasattr(zstd, "ZstdFile"):
+        return zstd.ZstdFile(input_log_filepath, mode)
+    return io.BufferedReader(zstd.ZstdDecompressor().stream_reader(open(input_log_filepath, 'rb'), closefd=True))
+
+
+# Compressed archives of the daily files, e.g. errors_2025-01-01.log.gz, and how to open them.
+# They are decompressed in chunks while they are read, never to a temporary copy.
+COMPRESSED_OPENERS = {".gz": gzip.open, ".bz2": bz2.open}
+if zstd is not None:
+    COMPRESSED_OPENERS[".zst"] = openZstd
+
+# Name of the daily error log files, e.g. errors_2025-01-01.log, plain or compressed
+error_log_pattern = re.compile(r"errors_\d{4}-\d{2}-\d{2}.log(" + "|".join(re.escape(ext) for ext in COMPRESSED_OPENERS) + ")?$")
+
+
+def compressionOf(input_log_filepath):
+    """Returns the compression extension of a log file (".gz", ".bz2", ".zst"), or None for a plain file."""
+    extension = os.path.splitext(str(input_log_filepath))[1]
+    return extension if extension in COMPRESSED_OPENERS else None
+
+
+def logFileName(filename: str) -> str:
+    """
+    Returns the name a log file is tracked under in FileInfo: the plain .log name, so an archived
+    day continues from the checkpoint of the file it was compressed from.
+    """
+    extension = compressionOf(filename)
+    return filename[:-len(extension)] if extension else filename
+
+
+def openLogFile(input_log_filepath):
+    """Opens a log file for binary reading, decompressing it on the fly if it is compressed."""
+    extension = compressionOf(input_log_filepath)
+    if extension:
+        return COMPRESSED_OPENERS[extension](input_log_filepath, 'rb')
+    return open(input_log_filepath, 'rb')
+
+
+def findLogFile(folder, filename: str):
+    """Returns the path of a tracked log file: the plain file, or its compressed archive if it was compressed since."""
+    for extension in ("",) + tuple(COMPRESSED_OPENERS):
+        path = os.path.join(folder, filename + extension)
+        if os.path.exists(path):
+            return path
+    return os.path.join(folder, filename)
 
 
 def checkNewLines(input_log_filepath: str, last_line: int) -> None:
@@ -32,18 +95,195 @@ def checkNewLines(input_log_filepath: str, last_line: int) -> None:
         return False, None, None
 
 
+def getFileIdentity(input_log_filepath):
+    """
+    Returns the identity of a log file as stored in the FileInfo document.
+
+    Args:
+        input_log_filepath (str): Path to the log file.
+
+    Returns:
+        dict | None: {"Inode", "Filesize", "Mtime"} for the file, or None if it cannot be stat'ed.
+    """
+    try:
+        st = os.stat(input_log_filepath)
+    except OSError:
+        return None
+    return {"Inode": st.st_ino, "Filesize": st.st_size, "Mtime": st.st_mtime}
+
+
+def getLineOffset(input_log_filepath, line_number: int) -> int:
+    """
+    Returns the byte offset where the given (0-based) line starts.
+    Only used once to migrate a FileInfo document that has a Lastlineread but no Lastbyteread yet.
+    """
+    offset = 0
+    try:
+        with openLogFile(input_log_filepath) as f:
+            for i, raw_line in enumerate(f):
+                if i >= line_number:
+                    break
+                offset += len(raw_line)
+    except OSError as e:
+        print(f"An error occurred while reading the file: {e}")
+        return 0
+    return offset
+
+
+def findLastNewline(f, start: int, end: int, block_size: int = 65536) -> int:
+    """
+    Returns the offset just past the last newline between start and end, or start if there is none.
+    Scans backwards from end in blocks, so only the unfinished tail of the file is read.
+    """
+    pos = end
+    while pos > start:
+        block_start = max(start, pos - block_size)
+        f.seek(block_start)
+        index = f.read(pos - block_start).rfind(b"\n")
+        if index != -1:
+            return block_start + index + 1
+        pos = block_start
+    return start
+
+
+class LogTail:
+    """
+    Iterable over the complete lines of a log file between two byte offsets.
+
+    Lines are read and decoded one at a time, so iterating holds a single line in memory.
+    While iterating, offset and lines_read are advanced to reflect what has been consumed,
+    which is what gets written back as the checkpoint, and line_offset is the offset of the line just read.
+    For a compressed file, offsets are positions in the decompressed data.
+    """
+
+    def __init__(self, input_log_filepath, start_offset: int, end_offset: int):
+        self.input_log_filepath = input_log_filepath
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+        self.offset = start_offset
+        self.line_offset = start_offset
+        self.lines_read = 0
+        self.compressed = compressionOf(input_log_filepath) is not None
+
+    def __iter__(self):
+        with openLogFile(self.input_log_filepath) as f:
+            # A compressed file is decompressed up to the offset and the data before it discarded
+            if f.seekable():
+                f.seek(self.offset)
+            else:
+                # e.g. the zstandard stream reader
+                skip = self.offset
+                while skip > 0:
+                    chunk = f.read(min(skip, 1 << 20))
+                    if not chunk:
+                        break
+                    skip -= len(chunk)
+            for raw_line in f:
+                if self.offset >= self.end_offset:
+                    break
+                self.line_offset = self.offset
+                self.offset += len(raw_line)
+                self.lines_read += 1
+                # Match open(..., 'r') line endings
+                if raw_line.endswith(b"\r\n"):
+                    raw_line = raw_line[:-2] + b"\n"
+                yield raw_line.decode('utf-8', errors='replace')
+
+
+def openTail(input_log_filepath, last_offset: int, last_identity=None, include_partial_line: bool = False):
+    """
+    Prepares to read only the lines appended to a log file since the stored byte offset.
+
+    The file is seeked straight to last_offset, so the cost depends on the amount of new data
+    and not on the size of the file. Only complete lines are consumed: a trailing line that is
+    still being written is left for the next poll.
+    If the file was replaced (different inode) or truncated (smaller than the offset), reading
+    restarts safely from the beginning of the file.
+
+    Args:
+        input_log_filepath (str): Path to the log file.
+        last_offset (int): Byte offset of the first unread byte (FileInfo "Lastbyteread").
+        last_identity (dict | None): The identity stored with the offset (FileInfo "Identity").
+        include_partial_line (bool): Also read a last line without newline, for files that
+                                     are no longer written to.
+
+    Returns:
+        tuple: (tail, identity, restarted) where tail is a LogTail over the new lines,
+               or None if there are no new complete lines.
+    """
+    identity = getFileIdentity(input_log_filepath)
+    if identity is None:
+        print(f"Error: The file {input_log_filepath} was not found.")
+        return None, last_identity, False
+
+    if compressionOf(input_log_filepath):
+        # Archives are complete and are read once from the checkpoint to their end. Their
+        # decompressed size is unknown without reading them, so the identity tells if it was read.
+        if last_offset and last_identity == identity:
+            return None, identity, False
+        return LogTail(input_log_filepath, last_offset, sys.maxsize), identity, False
+
+    restarted = False
+    if last_identity and last_identity.get("Inode") and identity["Inode"] and last_identity["Inode"] != identity["Inode"]:
+        print(f"File {input_log_filepath} was replaced. Restarting from the beginning.")
+        restarted = True
+    elif identity["Filesize"] < last_offset:
+        print(f"File {input_log_filepath} was truncated. Restarting from the beginning.")
+        restarted = True
+    if restarted:
+        last_offset = 0
+
+    if identity["Filesize"] == last_offset:
+        return None, identity, restarted
+
+    if include_partial_line:
+        end = identity["Filesize"]
+    else:
+        try:
+            with open(input_log_filepath, 'rb') as f:
+                # Only consume complete lines; the rest is read again on the next poll
+                end = findLastNewline(f, last_offset, identity["Filesize"])
+        except Exception as e:
+            print(f"An error occurred while reading the file: {e}")
+            return None, last_identity, restarted
+
+    if end == last_offset:
+        return None, identity, restarted
+    return LogTail(input_log_filepath, last_offset, end), identity, restarted
+
+
+# Folder -> (directory mtime, sorted error log files) of the last listing
+_listing_cache = {}
+
+
 def checkErrorLogFiles(path):
-    
+    """
+    Returns the error log files of a folder, newest day first.
+
+    Creating, deleting or renaming a file changes the mtime of its directory, so the folder is
+    only listed again when that mtime changes; appending to a file doesn't need a new listing.
+    """
     # print(f"Checking folder: {path}")
-    if not path.exists():
+    try:
+        directory_mtime = os.stat(path).st_mtime_ns
+    except OSError:
         print(f"Folder does not exist: {path}")
         return []
-    
+
+    cached = _listing_cache.get(path)
+    if cached is not None and cached[0] == directory_mtime:
+        return list(cached[1])
+    listed_at = time.time_ns()
+
     # List all files in the folder
     all_files = [f.name for f in path.iterdir() if f.is_file()]
-    pattern = re.compile(r"errors_\d{4}-\d{2}-\d{2}.log$")
-    matching_files = sorted([f for f in all_files if pattern.match(f)],reverse=True)
+    # Newest day first; for the same day, the plain file before its compressed archives
+    matching_files = sorted([f for f in all_files if error_log_pattern.match(f)],
+                            key=lambda f: (logFileName(f), f == logFileName(f)), reverse=True)
 
+    # A change in the same mtime tick as the listing could go unnoticed: only cache settled folders
+    if listed_at - directory_mtime > 2 * 10 ** 9:
+        _listing_cache[path] = (directory_mtime, tuple(matching_files))
     return matching_files
         
 
@@ -52,10 +292,10 @@ def getLatestFile(FOLDER_PATH):
     # Get all the error log files
     files = checkErrorLogFiles(FOLDER_PATH)
 
-    # Get the first file name from the list
-    LATEST_FILE_NAME = files[0]
+    # Get the first file name from the list, tracked under its plain .log name
+    LATEST_FILE_NAME = logFileName(files[0])
     # print("Latest file name:", LATEST_FILE_NAME)
-    LATEST_FILE_PATH = os.path.join(FOLDER_PATH, LATEST_FILE_NAME)
+    LATEST_FILE_PATH = os.path.join(FOLDER_PATH, files[0])
 
     # print("Latest file path:", LATEST_FILE_PATH)
 
@@ -0,0 +1,103 @@
+import datetime
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+# Parts of a .NET stack trace that change between occurrences of the same error
+NORMALIZE_PATTERNS = (
+    # in C:\src\App\HomeController.cs:line 42
+    (re.compile(r":line \d+"), ":line"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<guid>"),
+    # Memory addresses and IL offsets, e.g. +0x1a or at 0x00007FF8
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<addr>"),
+)
+
+# Error code MongoDB returns when two writers upsert the same new fingerprint at the same time
+DUPLICATE_KEY_ERROR = 11000
+
+
+def normalize_stack_trace(stack_trace: str) -> str:
+    """Strips line numbers, GUIDs and addresses, so repeats of the same error give the same text."""
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        stack_trace = pattern.sub(replacement, stack_trace)
+    return stack_trace
+
+
+def fingerprint_stack_trace(stack_trace: str) -> str:
+    """Returns the fingerprint (hex digest of the normalized trace) identifying a stack trace."""
+    return hashlib.blake2b(normalize_stack_trace(stack_trace).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class TraceStore:
+    """
+    Stores each unique stack trace once, in its own collection, keyed by its fingerprint.
+
+    Log entries reference their trace with a "StackTraceId" field instead of carrying the full
+    "StackTrace". Fingerprints known to be stored are kept in an LRU cache, so during an incident
+    the repeats of a trace cost no round trip at all; only new fingerprints are upserted.
+    One store is shared by all the writers of the daemon.
+    """
+
+    def __init__(self, collection, cache_size: int = 10000):
+        """
+        Args:
+            collection: The pymongo collection the unique traces are stored in.
+            cache_size (int): Number of known fingerprints kept in memory.
+        """
+        self.collection = collection
+        self.cache_size = cache_size
+        self.known = OrderedDict()
+        self.lock = threading.Lock()
+
+    def dedupe(self, documents: list[dict]) -> None:
+        """
+        Replaces the StackTrace of each document with its StackTraceId, storing the traces not seen
+        before. The new traces are written before the documents referencing them.
+        """
+        new_traces = {}
+        for document in documents:
+            stack_trace = document.pop("StackTrace", "")
+            if not stack_trace:
+                continue
+            fingerprint = fingerprint_stack_trace(stack_trace)
+            document["StackTraceId"] = fingerprint
+            if fingerprint not in new_traces and not self._is_known(fingerprint):
+                new_traces[fingerprint] = stack_trace
+
+        if new_traces:
+            self._store(new_traces)
+
+    def _is_known(self, fingerprint: str) -> bool:
+        with self.lock:
+            if fingerprint in self.known:
+                self.known.move_to_end(fingerprint)
+                return True
+            return False
+
+    def _store(self, new_traces: dict) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # The first trace seen is kept as an example; its normalized text is what was hashed
+        requests = [UpdateOne({"_id": fingerprint},
+                              {"$setOnInsert": {"StackTrace": stack_trace,
+                                                "Normalized": normalize_stack_trace(stack_trace),
+                                                "FirstSeen": now}},
+                              upsert=True)
+                    for fingerprint, stack_trace in new_traces.items()]
+        try:
+            self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not errors or any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+
+        with self.lock:
+            for fingerprint in new_traces:
+                self.known[fingerprint] = True
+                self.known.move_to_end(fingerprint)
+            while len(self.known) > self.cache_size:
+                self.known.popitem(last=False)
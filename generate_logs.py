@@ -0,0 +1,133 @@
+import argparse
+import datetime
+import os
+import random
+import uuid
+
+
+CONTROLLERS = {
+    "Home": ["Index", "About", "Contact"],
+    "Account": ["Login", "Logout", "Register", "ResetPassword"],
+    "Orders": ["Index", "Details", "Create", "Edit", "Export"],
+    "Reports": ["Daily", "Monthly", "Download"],
+    "Api": ["Get", "Post", "Search"],
+}
+EXCEPTIONS = [
+    "System.NullReferenceException: Object reference not set to an instance of an object.",
+    "System.InvalidOperationException: Sequence contains no elements",
+    "System.Data.SqlClient.SqlException: Execution Timeout Expired.",
+    "System.Web.HttpException: The controller for path was not found or does not implement IController.",
+    "System.ArgumentException: An item with the same key has already been added.",
+]
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+]
+STATUS_CODES = [500, 500, 500, 404, 403, 400]
+
+
+def generate_entry(rnd: random.Random, timestamp: datetime.datetime, skew: float = 0.5,
+                   trace_lines: tuple[int, int] = (10, 60), newline: str = "\r\n") -> str:
+    """
+    Builds one realistic error log entry.
+
+    Args:
+        rnd (random.Random): Source of randomness, seeded for reproducible files.
+        timestamp (datetime.datetime): Local server time of the entry.
+        skew (float): Share of the entries that hit the same hot Controller/Action/exception,
+                      like during an incident. 0 spreads entries evenly.
+        trace_lines (tuple[int, int]): Min and max number of "at ..." stack trace lines.
+        newline (str): Line ending, "\\r\\n" like the Windows app servers write.
+
+    Returns:
+        str: The entry, ending with a newline.
+    """
+    if rnd.random() < skew:
+        controller, action, exception, status = "Orders", "Details", EXCEPTIONS[0], 500
+    else:
+        controller = rnd.choice(list(CONTROLLERS))
+        action = rnd.choice(CONTROLLERS[controller])
+        exception = rnd.choice(EXCEPTIONS)
+        status = rnd.choice(STATUS_CODES)
+    utc = timestamp + datetime.timedelta(hours=5)
+
+    lines = [
+        f"{timestamp:%Y-%m-%d %H:%M:%S}.{timestamp.microsecond // 100:04d} ERROR Guid {uuid.UUID(int=rnd.getrandbits(128))}",
+        f"HTTP ERROR {status}",
+        f"UTC Date: {utc.month}/{utc.day}/{utc.year} {utc.hour % 12 or 12}:{utc:%M:%S} {'AM' if utc.hour < 12 else 'PM'}",
+        f"Controller: {controller}",
+        f"Action: {action}",
+        f"URL: https://app.example.com/{controller}/{action}/{rnd.randint(1, 10 ** 6)}",
+        f"Remote host: 10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+        f"User: CORP\\user{rnd.randint(1, 2000)}",
+        f"User agent: {rnd.choice(USER_AGENTS)}",
+        "",
+        f"Exception: {exception}",
+    ]
+    for depth in range(rnd.randint(*trace_lines)):
+        lines.append(f"   at App.{controller}.Service{depth % 7}.Step{depth}(Int32 id, String name) "
+                     f"in C:\\build\\src\\App\\{controller}\\Service{depth % 7}.cs:line {rnd.randint(10, 2000)}")
+    lines += [
+        "---------------",
+        "",
+        "Headers",
+        "Cache-Control: no-cache",
+        "Connection: keep-alive",
+        "Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Encoding: gzip, deflate, br",
+        "Accept-Language: en-US,en;q=0.9",
+        f"Cookie: ASP.NET_SessionId={uuid.UUID(int=rnd.getrandbits(128)).hex}",
+        "Host: app.example.com",
+        f"Referer: https://app.example.com/{controller}",
+        f"User-Agent: {rnd.choice(USER_AGENTS)}",
+        "",
+    ]
+    return newline.join(lines) + newline
+
+
+def generate_log_file(path, day: datetime.date, size_bytes: int | None = None, entries: int | None = None,
+                      skew: float = 0.5, trace_lines: tuple[int, int] = (10, 60), seed: int = 0) -> int:
+    """
+    Writes an errors_YYYY-MM-DD.log style file of about size_bytes, or of a number of entries.
+
+    Returns:
+        int: The number of entries written.
+    """
+    rnd = random.Random(seed)
+    timestamp = datetime.datetime.combine(day, datetime.time())
+    written_entries = 0
+    written_bytes = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        while True:
+            if entries is not None and written_entries >= entries:
+                break
+            if entries is None and written_bytes >= (size_bytes or 0):
+                break
+            timestamp += datetime.timedelta(microseconds=rnd.randint(1000, 2000000))
+            entry = generate_entry(rnd, timestamp, skew, trace_lines)
+            f.write(entry)
+            written_entries += 1
+            written_bytes += len(entry)
+    return written_entries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Writes synthetic errors_YYYY-MM-DD.log files.")
+    parser.add_argument("folder", help="Folder the log files are written to")
+    parser.add_argument("--days", type=int, default=1, help="Number of daily files, ending today")
+    parser.add_argument("--size-mb", type=float, default=10, help="Approximate size of each file")
+    parser.add_argument("--skew", type=float, default=0.5, help="Share of entries hitting the same hot error")
+    parser.add_argument("--min-trace", type=int, default=10)
+    parser.add_argument("--max-trace", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.folder, exist_ok=True)
+    today = datetime.date.today()
+    for offset in range(args.days - 1, -1, -1):
+        day = today - datetime.timedelta(days=offset)
+        path = os.path.join(args.folder, f"errors_{day:%Y-%m-%d}.log")
+        count = generate_log_file(path, day, size_bytes=int(args.size_mb * 1048576), skew=args.skew,
+                                  trace_lines=(args.min_trace, args.max_trace), seed=args.seed + offset)
+        print(f"{path}: {count} entries")
@@ -0,0 +1,92 @@
+import sys
+
+
+# Document keys, in the order parse_log_entry produces them, and the matching attribute names
+FIELDS = (
+    ("ServerDateTime", "server_date_time"),
+    ("Date", "date"),
+    ("Time", "time"),
+    ("UTC Date", "utc_date"),
+    ("UTC Time", "utc_time"),
+    ("HTTPStatusCode", "http_status_code"),
+    ("ErrorCode", "error_code"),
+    ("Controller", "controller"),
+    ("Action", "action"),
+    ("URL", "url"),
+    ("RemoteHost", "remote_host"),
+    ("User", "user"),
+    ("UserAgent", "user_agent"),
+    ("StackTrace", "stack_trace"),
+    ("Host", "host"),
+    ("Referer", "referer"),
+    ("Server", "server"),
+    # Typed datetimes of ServerDateTime (server local time) and of UTC Date / UTC Time, None if malformed
+    ("Timestamp", "timestamp"),
+    ("UTCTimestamp", "utc_timestamp"),
+)
+
+# Fields that repeat heavily across entries; equal values share one string object
+INTERNED_FIELDS = {"Date", "UTC Date", "HTTPStatusCode", "Controller", "Action", "UserAgent", "Host", "Server"}
+
+# Distinct values kept per interned field, so a field with unexpectedly high cardinality can't grow forever
+MAX_INTERNED_VALUES = 10000
+
+_interned = {key: {} for key in INTERNED_FIELDS}
+
+
+def intern_value(key: str, value: str) -> str:
+    """Returns the shared copy of a low-cardinality field value."""
+    values = _interned[key]
+    shared = values.get(value)
+    if shared is not None:
+        return shared
+    if len(values) < MAX_INTERNED_VALUES:
+        values[value] = sys.intern(value)
+        return values[value]
+    return value
+
+
+class LogRecord:
+    """
+    Compact representation of a parsed log entry.
+
+    Uses __slots__ instead of a per-entry dict, and shares the strings of low-cardinality
+    fields (Controller, Action, Host, UserAgent, Server, HTTPStatusCode, Date...) between records.
+    It is converted to a Mongo document only at the sink, with to_document().
+    """
+
+    __slots__ = tuple(name for _, name in FIELDS) + ("truncated",)
+
+    @classmethod
+    def from_dict(cls, extracted_data: dict) -> "LogRecord":
+        """Builds a record from the dictionary returned by parse_log_entry."""
+        record = cls()
+        for key, name in FIELDS:
+            value = extracted_data.get(key)
+            if key in INTERNED_FIELDS:
+                value = intern_value(key, value)
+            setattr(record, name, value)
+        record.truncated = extracted_data.get("Truncated", False)
+        return record
+
+    def to_document(self) -> dict:
+        """Returns the same document parse_log_entry (and iter_parse_entries) would have produced."""
+        document = {key: getattr(self, name) for key, name in FIELDS}
+        if self.truncated:
+            document["Truncated"] = True
+        return document
+
+    def __eq__(self, other):
+        if not isinstance(other, LogRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"LogRecord({self.to_document()!r})"
+
+
+def to_document(record) -> dict:
+    """Returns the Mongo document of a parsed entry, whether it is a dict or a LogRecord."""
+    if isinstance(record, LogRecord):
+        return record.to_document()
+    return record
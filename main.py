@@ -1,17 +1,32 @@
 
-import json
 import os
+import threading
+import time
+from contextlib import nullcontext
 from dotenv import load_dotenv
 import datetime
-from pathlib import Path
-import time
+from itertools import islice
 from datetime import datetime, timedelta
 from pymongo import MongoClient
-import schedule
 
-from file_handling import checkNewLines, getLatestFile
-from parse_log_entries import parse_log_entry
-from split_entries import split_entries
+from backfill import CatchUp
+from checkpoint_cache import CheckpointCache
+from fingerprint import TraceStore
+from metrics import Metrics, StageTimer
+from mongo_writer import MongoBulkWriter
+from parallel_parse import find_last_entry_start, parallel_parse_tail
+from pipeline import Pipeline
+from profiling import CycleProfiler
+from sources import SourceScheduler, load_sources
+from watcher import watch_folder
+from file_handling import (checkErrorLogFiles, compressionOf, findLogFile, getLatestFile, getLineOffset,
+                           logFileName, LogTail, openTail)
+from parse_log_entries import iter_parse_entries
+from rollup import RollupCounter
+from search_store import SearchStore
+from spool import Spool
+from split_entries import iter_split_entries
+from storm import StormControl
 
 
 def get_collection():
@@ -24,9 +39,9 @@ def get_collection():
         print(f"Error connecting to MongoDB: {e}")
         return None, None
 
-def check_file(filename):
+def check_file(filename, server_name):
     """
-    Checks if a file with the given filename exists in the FileInfo collection.
+    Checks if a file with the given filename exists in the FileInfo collection for a server.
     Returns the document if it exists, otherwise None.
     """
     collection, client = get_collection()
@@ -34,7 +49,9 @@ def check_file(filename):
         return None
 
     try:
-        query = {"Filename": filename}
+        if CHECKPOINT_CACHE is not None:
+            return CHECKPOINT_CACHE.get(server_name, filename)
+        query = {"Server": server_name, "Filename": filename}
         document = collection.find_one(query)
         return document
     except Exception as e:
@@ -42,16 +59,17 @@ def check_file(filename):
         return None
 
 
-def update_file_info(filename, new_last_line_read=None, new_is_done=None, new_filepath=None):
+def update_file_info(filename, server_name, new_last_line_read=None, new_is_done=None, new_filepath=None,
+                     new_last_byte_read=None, new_identity=None):
     """
-    Updates the information for a file based on its filename.
+    Updates the information for a file based on its server and filename.
     Only updates the fields for which new values are provided.
     """
     collection, client = get_collection()
     if collection is None:
         return
 
-    query = {"Filename": filename}
+    query = {"Server": server_name, "Filename": filename}
     update_fields = {}
 
     if new_last_line_read is not None:
@@ -60,6 +78,10 @@ def update_file_info(filename, new_last_line_read=None, new_is_done=None, new_fi
         update_fields["Isdone"] = new_is_done
     if new_filepath is not None:
         update_fields["Filepath"] = new_filepath
+    if new_last_byte_read is not None:
+        update_fields["Lastbyteread"] = new_last_byte_read
+    if new_identity is not None:
+        update_fields["Identity"] = new_identity
     # if new_filename is not None:
     #     update_fields["Filename"] = new_filename
 
@@ -70,16 +92,21 @@ def update_file_info(filename, new_last_line_read=None, new_is_done=None, new_fi
     update_operation = {"$set": update_fields}
 
     try:
+        if CHECKPOINT_CACHE is not None:
+            # Written through or behind by the cache
+            if not CHECKPOINT_CACHE.update(server_name, filename, update_fields):
+                print(f"No document found with Server: {server_name}, Filename: {filename} to update.")
+            return
         result = collection.update_one(query, update_operation)
         if result.matched_count > 0:
-            print(f"Successfully updated {result.modified_count} document(s) for Filename: {filename}")
+            print(f"Successfully updated {result.modified_count} document(s) for Server: {server_name}, Filename: {filename}")
         else:
-            print(f"No document found with Filename: {filename} to update.")
+            print(f"No document found with Server: {server_name}, Filename: {filename} to update.")
     except Exception as e:
         print(f"Error updating document: {e}")
 
 
-def insert_or_update_file_info(filename, filepath, last_line_read, is_done):
+def insert_or_update_file_info(filename, server_name, filepath, last_line_read, is_done):
     """
     Inserts a new document if the filename doesn't exist, otherwise updates it.
     """
@@ -87,161 +114,427 @@ def insert_or_update_file_info(filename, filepath, last_line_read, is_done):
     if collection is None:
         return
 
-    query = {"Filename": filename}
+    query = {"Server": server_name, "Filename": filename}
     new_values = {
+        "Server": server_name,
         "Filename": filename,
         "Filepath": filepath,
         "Lastlineread": last_line_read,
+        "Lastbyteread": 0,
+        "Identity": None,
         "Isdone": is_done
     }
 
     # The upsert=True option will insert the document if it doesn't exist.
     # If it exists, it will update it.
     try:
+        if CHECKPOINT_CACHE is not None:
+            # Queued updates of the file must not overwrite these values later
+            CHECKPOINT_CACHE.forget(server_name, filename)
         result = collection.update_one(query, {"$set": new_values}, upsert=True)
+        if CHECKPOINT_CACHE is not None:
+            # The next cycle reads the checkpoint from memory instead of Mongo
+            CHECKPOINT_CACHE.put(server_name, filename, new_values)
         if result.upserted_id:
-            print(f"Inserted new document with ID: {result.upserted_id} for Filename: {filename}")
+            print(f"Inserted new document with ID: {result.upserted_id} for Server: {server_name}, Filename: {filename}")
         elif result.matched_count > 0:
-            print(f"Updated existing document for Filename: {filename}. Modified count: {result.modified_count}")
+            print(f"Updated existing document for Server: {server_name}, Filename: {filename}. Modified count: {result.modified_count}")
         else:
-            print(f"Operation completed for Filename: {filename}, but no changes were made (document already matched).")
+            print(f"Operation completed for Server: {server_name}, Filename: {filename}, but no changes were made (document already matched).")
     except Exception as e:
         print(f"Error inserting or updating document: {e}")
 
 
+def get_checkpoint(filename, server_name):
+    """
+    Returns the checkpoint of a file: the one last committed to the spool when there is a spool
+    (FileInfo may still be behind it), otherwise the FileInfo document.
+    """
+    if SPOOL is not None:
+        spooled = SPOOL.get_checkpoint(server_name, filename)
+        if spooled is not None:
+            return spooled
+    return check_file(filename, server_name)
+
 
-def main(log_lines, start_line_number):
+def apply_spooled_checkpoint(server_name, filename, document):
+    """Writes a checkpoint from the spool to FileInfo once its entries are in Mongo. Raises on error, so it is retried."""
+    collection, client = get_collection()
+    collection.update_one({"Server": server_name, "Filename": filename}, {"$set": document}, upsert=True)
+    if CHECKPOINT_CACHE is not None:
+        CHECKPOINT_CACHE.forget(server_name, filename)
+
+
+def migrate_file_info(server_name):
     """
-    Main function to demonstrate extracting specific log entries from a string.
+    FileInfo documents used to be keyed by Filename only, when a single server was ingested.
+    Assigns those documents to that server and indexes the (Server, Filename) key.
     """
-    #print("Simulating log processing from provided content...")
-    
-    # You can keep the output filename as is, or change it.
-    
-    # last_line = 874569 # 54
-     #100
-    log_lines_lenght = len(log_lines)
-    output_json = []
-    
-    
-        
-    # 2. Use split_entries to get potential log entry strings
-    # split_entries will identify entries starting with the ERROR Guid pattern
-    # We start from line 0 to process the entire provided content
-    potential_entries = split_entries(log_lines, start_line_number)
-
-    last_line = log_lines_lenght
-    if not potential_entries:
-        print("No potential log entries found matching the start pattern.")
-        return False, None, last_line, None
-
-    #print(f"Identified {len(potential_entries)} potential log entries based on start pattern.")
-    
+    collection, client = get_collection()
+    if collection is None:
+        return
+
+    try:
+        result = collection.update_many({"Server": {"$exists": False}}, {"$set": {"Server": server_name}})
+        if result.modified_count:
+            print(f"Assigned {result.modified_count} FileInfo document(s) to Server: {server_name}")
+        collection.create_index([("Server", 1), ("Filename", 1)], unique=True)
+    except Exception as e:
+        print(f"Error migrating FileInfo documents: {e}")
 
-    server_name = "US"
 
-    # 3. Parse each potential entry and filter for valid ones
-    # parse_log_entry will return None for entries that don't fully match the expected structure
-    # (specifically, those not starting with ERROR Guid as per its logic, although split_entries
-    # should have already filtered for the start pattern). We filter out None results.
-    parsed_results = map(lambda entry_string: parse_log_entry(entry_string, server_name), potential_entries)
-    valid_parsed_entries = list(filter(None, parsed_results))
-    valid_parsed_entries_lenght = len(valid_parsed_entries)
-    
-    if not valid_parsed_entries:
-        print("No valid log entries parsed after applying parsing logic.")
-        return False, None, last_line, None 
+def ensure_log_collection(layout="regular", retention_days=0):
+    """
+    Creates the LogEntries collection layout and the indexes time-range and retention queries use.
+
+    "regular": a Timestamp index (a TTL index when retention_days is set) and a compound
+    (Server, Controller, Timestamp) index. "timeseries": a MongoDB time-series collection on
+    Timestamp with Server as its meta field, expiring after retention_days; it only applies
+    when the collection doesn't exist yet. Time-series collections don't enforce a unique _id,
+    so entries written again after a failure (a retried batch, a spool replay) are duplicated.
+    Timestamp is the server local time, stored as is.
+    """
+    database = client[DATABASE_NAME]
+    collection = database[LOG_COLLECTION_NAME]
+    expire_after = int(retention_days * 86400)
+    try:
+        if layout == "timeseries":
+            if LOG_COLLECTION_NAME not in database.list_collection_names():
+                options = {"timeseries": {"timeField": "Timestamp", "metaField": "Server", "granularity": "seconds"}}
+                if expire_after:
+                    options["expireAfterSeconds"] = expire_after
+                database.create_collection(LOG_COLLECTION_NAME, **options)
+                print(f"Created the time-series collection {LOG_COLLECTION_NAME}")
+            else:
+                info = next(database.list_collections(filter={"name": LOG_COLLECTION_NAME}), {})
+                if info.get("type") != "timeseries":
+                    print(f"{LOG_COLLECTION_NAME} already exists as a regular collection, it is kept as is.")
+        else:
+            existing = next((index for index in collection.index_information().values()
+                             if index["key"] == [("Timestamp", 1)]), None)
+            if existing is None:
+                collection.create_index("Timestamp", **({"expireAfterSeconds": expire_after} if expire_after else {}))
+            elif expire_after and existing.get("expireAfterSeconds") != expire_after:
+                # Change the retention of the existing index in place
+                database.command("collMod", LOG_COLLECTION_NAME,
+                                 index={"keyPattern": {"Timestamp": 1}, "expireAfterSeconds": expire_after})
+            elif not expire_after and "expireAfterSeconds" in existing:
+                print(f"The Timestamp index of {LOG_COLLECTION_NAME} still expires entries after "
+                      f"{existing['expireAfterSeconds']}s, drop it to keep them.")
+        collection.create_index([("Server", 1), ("Controller", 1), ("Timestamp", -1)])
+    except Exception as e:
+        print(f"Error creating the {LOG_COLLECTION_NAME} layout and indexes: {e}")
+
+
+def main(log_lines, start_line_number=0, server_name="US", max_entry_size=None, compact=False, timer=None, split=None):
+    """
+    Streams the valid parsed log entries out of an iterable of log lines.
+
+    The lines, the entry strings and the parsed entries are all generators: each entry is
+    passed downstream as soon as it is complete, so memory stays flat no matter how large
+    the file or the backlog is. Entries longer than max_entry_size characters are truncated
+    and flagged with "Truncated": True. With compact, entries are LogRecord objects.
+    With a StageTimer, the read, split and parse stages are timed and counted.
+    split replaces iter_split_entries, e.g. with the split of an EntrySplitter; it is called
+    with the (timed) lines.
+    """
+    if start_line_number:
+        log_lines = islice(log_lines, start_line_number, None)
+    if timer is not None:
+        # A split may read the offsets of the tail as it goes, so its lines must not be read ahead
+        log_lines = timer.wrap(log_lines, "read", chunk_size=1024 if split is None else 1)
+
+    # split_entries identifies entries starting with the ERROR Guid pattern.
+    # parse_log_entry drops the ones that don't fully match the expected structure.
+    potential_entries = split(log_lines) if split is not None else iter_split_entries(log_lines, max_entry_size)
+    if timer is not None:
+        potential_entries = timer.wrap(potential_entries, "split")
+    parsed_entries = iter_parse_entries(potential_entries, server_name, compact)
+    if timer is not None:
+        parsed_entries = timer.wrap(parsed_entries, "parse")
+    return parsed_entries
 
-    #print(f"Successfully parsed {len(valid_parsed_entries)} valid log entries.")
 
-    # 4. Output the extracted data as JSON
-    # print("\n--- Extracted Log Entries (JSON Output) ---")
-    # print(json.dumps(valid_parsed_entries, indent=4, ensure_ascii=False))
-    # print("-----------------------------------------")
+def timed(stage, server_name):
+    """Times a block as a stage in the metrics, when they are enabled."""
+    return METRICS.time(stage, server=server_name) if METRICS is not None else nullcontext()
 
-    output_json = json.dumps(valid_parsed_entries, indent=4, ensure_ascii=False)
 
-    return True, output_json, last_line, valid_parsed_entries_lenght
+def record_ingest_metrics(server_name, timer, write_seconds, tail, new_entries):
+    """Records the stage timings and the counts of one ingest of new lines."""
+    for stage, seconds in timer.exclusive():
+        METRICS.observe("errorlogparser_stage_seconds", seconds, stage=stage, server=server_name)
+    # write_all pulls the entries through the other stages, which are timed on their own
+    METRICS.observe("errorlogparser_stage_seconds", max(write_seconds - timer.total(), 0.0), stage="write", server=server_name)
+    METRICS.inc("errorlogparser_lines_total", tail.lines_read, server=server_name)
+    METRICS.inc("errorlogparser_bytes_total", tail.offset - tail.start_offset, server=server_name)
+    METRICS.inc("errorlogparser_entries_total", new_entries, server=server_name)
+    if timer.items("split"):
+        METRICS.inc("errorlogparser_rejected_entries_total", timer.items("split") - timer.items("parse"), server=server_name)
 
 
 
-def main_program(FOLDER_PATH, MONGO, DATABASE_NAME, LOG_COLLECTION_NAME):
+def new_log_writer():
+    """Returns a MongoBulkWriter on the shared, pooled client."""
+    return MongoBulkWriter(client[DATABASE_NAME][LOG_COLLECTION_NAME], batch_size=BATCH_SIZE, max_retries=WRITE_RETRIES,
+                           trace_store=TRACE_STORE, rollup=ROLLUP, search_store=SEARCH_STORE)
 
-    global CURRENT_FILE_NAME
+
+def ingest_file(source, filename, filepath, writer, final=False):
+    """
+    Ingests the lines of a log file written after its FileInfo checkpoint and advances the checkpoint.
+
+    Args:
+        source (Source): The source the file belongs to.
+        filename (str): Name of the log file.
+        filepath (str): Path of the log file.
+        writer (MongoBulkWriter): Writer the parsed entries are sent to.
+        final (bool): The file is no longer written to, so a last line without newline is read too.
+
+    Returns:
+        tuple: (haveNewLines, last_line, new_entries)
+    """
+    server_name = source.server_name
+    new_entries = 0
+
+    # The live tail and the catch-up can both reach the same file around a day rollover
+    with source.file_lock(filename):
+        FILE = get_checkpoint(filename, server_name)
+        if not FILE and SPOOL is not None:
+            # FileInfo is created by the spool drainer with the first checkpoint
+            FILE = new_file_info(filename, server_name, filepath)
+        if not FILE:
+            # If the file doesn't exist in the database, insert it with last line 0
+            insert_or_update_file_info(filename, server_name, filepath, 0, False)
+            print("File not found in the database. Inserting new file info.")
+            FILE = check_file(filename, server_name)
+        # print("File info from the database:", FILE)
+        last_line = int(FILE["Lastlineread"])
+        last_offset = FILE.get("Lastbyteread")
+        if last_offset is None:
+            # Checkpoint written before byte-offset tailing: locate the offset of the last line read once
+            last_offset = getLineOffset(filepath, last_line)
+        # print("Last line read from the database:", last_line)
+        # The checkpoint is the start of the entry left open by the last poll, if any: its lines
+        # are still held by the splitter, so reading resumes after them
+        splitter = source.splitter(filename, MAX_ENTRY_SIZE)
+        read_line, read_offset = splitter.resume(last_line, int(last_offset))
+        # The open entry is complete once the file is done, or quiet for OPEN_ENTRY_TIMEOUT seconds
+        final_read = final or compressionOf(filepath) is not None or is_quiet(filepath)
+        # Check if new lines have been appended to the log file, reading only the new bytes
+        tail, identity, restarted = openTail(filepath, read_offset, FILE.get("Identity"), include_partial_line=final)
+        if restarted:
+            splitter.reset()
+            last_line = last_offset = read_line = read_offset = 0
+        if tail is None and splitter.pending and final_read:
+            # Nothing new, but the open entry can be written now
+            tail = LogTail(filepath, read_offset, read_offset)
+        haveNewLines = tail is not None
+        cut = False
+
+        # With a spool, the entries and the checkpoint are committed locally in one transaction,
+        # and the spool drainer sends them to Mongo
+        with SPOOL.transaction() if SPOOL is not None else nullcontext() as spooled:
+            # Parse the log file if new lines are found
+            if haveNewLines:
+                timer = StageTimer() if METRICS is not None else None
+                # Entries are streamed from the file and written BATCH_SIZE at a time.
+                # A large backlog (re-ingest, restart after an outage) is parsed in parallel chunks.
+                if PARSE_WORKERS > 1 and not tail.compressed and tail.end_offset - tail.start_offset >= PARALLEL_THRESHOLD:
+                    if splitter.pending:
+                        # Chunks start at an entry: the open entry is read again from its start
+                        tail = LogTail(filepath, splitter.start_offset, tail.end_offset)
+                        read_line = splitter.start_line
+                        splitter.reset()
+                    if not final_read:
+                        # The trailing entry may still be open, it is left for the next poll
+                        end_offset = tail.end_offset
+                        tail.end_offset = find_last_entry_start(filepath, tail.offset, end_offset)
+                        cut = tail.end_offset < end_offset
+                    entries = parallel_parse_tail(tail, server_name, PARSE_WORKERS, max_entry_size=MAX_ENTRY_SIZE,
+                                                  compact=COMPACT_RECORDS)
+                    if timer is not None:
+                        # Read, split and parse all happen in the worker processes
+                        entries = timer.wrap(entries, "parse")
+                elif PIPELINE is not None:
+                    # Reading, parsing and writing overlap
+                    entries = PIPELINE.entries(tail, server_name, batch_size=BATCH_SIZE, max_entry_size=MAX_ENTRY_SIZE,
+                                               compact=COMPACT_RECORDS,
+                                               split=lambda lines: splitter.split(tail, read_line, final_read, lines))
+                    if timer is not None:
+                        # Read and split happen in the reader thread, parse in the pool
+                        entries = timer.wrap(entries, "parse")
+                else:
+                    entries = main(tail, server_name=server_name, max_entry_size=MAX_ENTRY_SIZE, compact=COMPACT_RECORDS,
+                                   timer=timer,
+                                   split=lambda lines: splitter.split(tail, read_line, final_read, lines))
+                if STORM_CONTROL is not None:
+                    entries = STORM_CONTROL.filter(entries, on_suppressed=(
+                        (lambda count: METRICS.inc("errorlogparser_suppressed_entries_total", count, server=server_name))
+                        if METRICS is not None else None))
+                try:
+                    started = time.perf_counter()
+                    new_entries = (spooled or writer).write_all(entries)
+                    if timer is not None:
+                        record_ingest_metrics(server_name, timer, time.perf_counter() - started, tail, new_entries)
+                except Exception:
+                    # Keep the checkpoint where it is so the lines are read again next time
+                    writer.discard()
+                    # Stops the reader and parser stages still running
+                    entries.close()
+                    # The open entry is read again from the checkpoint
+                    splitter.reset()
+                    raise
+
+                if not new_entries:
+                    print("No valid log entries parsed after applying parsing logic.")
+                last_line, last_offset = splitter.checkpoint(read_line, tail)
+            if haveNewLines or restarted or FILE.get("Lastbyteread") is None:
+                with timed("checkpoint", server_name):
+                    if spooled is not None:
+                        spooled.set_checkpoint(server_name, filename, {**FILE, "Filepath": filepath, "Lastlineread": last_line,
+                                                                       "Lastbyteread": last_offset, "Identity": identity})
+                    else:
+                        update_file_info(filename, server_name, new_last_line_read=last_line,
+                                         new_last_byte_read=last_offset, new_identity=identity)
+
+    if METRICS is not None and not final:
+        try:
+            METRICS.set("errorlogparser_lag_bytes", max(os.path.getsize(filepath) - last_offset, 0), server=server_name)
+        except OSError:
+            pass
+
+    if (cut or splitter.pending) and not final:
+        recheck_later(source)
+
+    return haveNewLines, last_line, new_entries
+
+
+def is_quiet(filepath):
+    """True if a log file was not written to for OPEN_ENTRY_TIMEOUT seconds, so its last entry is complete."""
+    try:
+        return time.time() - os.path.getmtime(filepath) >= OPEN_ENTRY_TIMEOUT
+    except OSError:
+        return True
+
+
+def recheck_later(source):
+    """
+    Processes a source again once its held back entry has had time to complete.
+    A file that stops being written sends no more events, so the entry would otherwise wait for the next one.
+    """
+    with source.lock:
+        if source.recheck_timer is not None and source.recheck_timer.is_alive():
+            return
+        source.recheck_timer = threading.Timer(OPEN_ENTRY_TIMEOUT + 0.1, scheduler.trigger, (source,))
+        source.recheck_timer.daemon = True
+        source.recheck_timer.start()
+
+
+def new_file_info(filename, server_name, filepath):
+    """Returns the FileInfo document of a file nothing was read from yet."""
+    return {"Server": server_name, "Filename": filename, "Filepath": filepath, "Lastlineread": 0,
+            "Lastbyteread": 0, "Identity": None, "Isdone": False}
+
+
+def drain_file(source, filename, filepath):
+    """
+    Reads a file that is no longer the latest one up to its end, then marks it done.
+    Used on day rollover and by the catch-up of unfinished files.
+    """
+    ingest_file(source, filename, filepath, new_log_writer(), final=True)
+    source.splitters.pop(filename, None)
+    if SPOOL is not None:
+        # An empty file was never checkpointed
+        checkpoint = get_checkpoint(filename, source.server_name) or new_file_info(filename, source.server_name, filepath)
+        SPOOL.set_checkpoint(source.server_name, filename, {**checkpoint, "Isdone": True})
+    else:
+        update_file_info(filename, source.server_name, new_is_done=True)
+
+
+def find_unfinished_files(source):
+    """
+    Lists the error log files of a source, other than the latest one (which the live tail
+    reads), that are not in FileInfo, not done, or behind their end of file.
+    Compressed archives (.gz, .bz2, .zst) are included, under the name of their plain .log file;
+    their remaining bytes are their compressed size.
+
+    Returns:
+        list[tuple]: (filename, filepath, remaining_bytes), oldest file first.
+    """
+    server_name = source.server_name
+    files = checkErrorLogFiles(source.folder_path)
+    # One file per day, the plain file when it still exists next to its archive
+    candidates = {}
+    for file_name in files[1:]:
+        candidates.setdefault(logFileName(file_name), file_name)
+    if files:
+        candidates.pop(logFileName(files[0]), None)
+
+    unfinished = []
+    for filename, file_name in reversed(candidates.items()):
+        filepath = os.path.join(source.folder_path, file_name)
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            continue
+
+        FILE = get_checkpoint(filename, server_name)
+        if FILE is None:
+            unfinished.append((filename, filepath, size))
+            continue
+        if compressionOf(filepath):
+            # The decompressed size is unknown: an archive is finished once it is drained
+            if not FILE.get("Isdone"):
+                unfinished.append((filename, filepath, size))
+            continue
+
+        last_offset = FILE.get("Lastbyteread")
+        if last_offset is None:
+            # Checkpoint written before byte-offset tailing: locate and store its offset once
+            last_offset = getLineOffset(filepath, int(FILE["Lastlineread"]))
+            update_file_info(filename, server_name, new_last_byte_read=last_offset)
+        if not FILE.get("Isdone") or last_offset < size:
+            unfinished.append((filename, filepath, max(size - last_offset, 0)))
+    return unfinished
+
+
+def main_program(source):
+    """
+    Ingests the new lines of the latest error log file of one source.
+    Each source keeps its own current file and FileInfo checkpoints, so sources can be
+    processed concurrently.
+    """
+    server_name = source.server_name
     # clear = lambda: os.system('cls')
     # clear()
 
     # Get the latest file name and path
-    LATEST_FILE_NAME, LATEST_FILE_PATH = getLatestFile(FOLDER_PATH)
+    with timed("scan", server_name):
+        LATEST_FILE_NAME, LATEST_FILE_PATH = getLatestFile(source.folder_path)
 
-
-    new_entries = 0
-    last_line = 0
-    
     #print("Comparing current file name with latest file name...")
-    # print("Current file name:", CURRENT_FILE_NAME)
+    # print("Current file name:", source.current_file_name)
     # print("Latest file name:", LATEST_FILE_NAME)
 
-    haveLatest = check_file(LATEST_FILE_NAME)
-    if CURRENT_FILE_NAME != LATEST_FILE_NAME:
-        if haveLatest and CURRENT_FILE_NAME == None:
-            # If the file already exists in the database, get its last line
-            CURRENT_FILE_NAME = LATEST_FILE_NAME
-        elif haveLatest and CURRENT_FILE_NAME != None:
-            # If the file already exists in the database, get its last line
-            update_file_info(CURRENT_FILE_NAME, new_is_done=True)
-            CURRENT_FILE_NAME = LATEST_FILE_NAME
-            last_line = 0
-            insert_or_update_file_info(LATEST_FILE_NAME, LATEST_FILE_PATH, last_line, False)
-
-        elif not haveLatest and CURRENT_FILE_NAME == None:
-            # If the file doesn't exist in the database, insert it with last line 0, update the current file to Done reading( this means that a new file is created/ a new day has started)
-            #update_file_info(CURRENT_FILE_NAME, new_is_done=True)
-            CURRENT_FILE_NAME = LATEST_FILE_NAME
-            last_line = 0
-            insert_or_update_file_info(LATEST_FILE_NAME, LATEST_FILE_PATH, last_line, False)   
-        elif not haveLatest and CURRENT_FILE_NAME != None:
-            # If the file already exists in the database, get its last line
-            update_file_info(CURRENT_FILE_NAME, new_is_done=True)
-            CURRENT_FILE_NAME = LATEST_FILE_NAME
-            last_line = 0
-            insert_or_update_file_info(LATEST_FILE_NAME, LATEST_FILE_PATH, last_line, False)    
-        
-
-    #print("Getting last line from the database...")
-    #output_json_filepath = "parsed_log_output_2.json"
-    #print("Latest file name:", CURRENT_FILE_NAME)
-    if CURRENT_FILE_NAME == LATEST_FILE_NAME:
-        if not check_file(CURRENT_FILE_NAME):
-            # If the file doesn't exist in the database, insert it with last line 0
-            last_line = 0
-            insert_or_update_file_info(CURRENT_FILE_NAME, LATEST_FILE_PATH, last_line, False)
-            print("File not found in the database. Inserting new file info.")
+    if source.current_file_name != LATEST_FILE_NAME:
+        if source.current_file_name != None:
+            # A new file is created / a new day has started: read the lines written to the
+            # previous file since the last poll before marking it done
+            # It may have been compressed since
+            drain_file(source, source.current_file_name, findLogFile(source.folder_path, source.current_file_name))
+        source.current_file_name = LATEST_FILE_NAME
+
+    haveNewLines, last_line, new_entries = ingest_file(source, LATEST_FILE_NAME, LATEST_FILE_PATH, source.writer)
 
-    FILE = check_file(CURRENT_FILE_NAME)
-    # print("File info from the database:", FILE)
-    last_line = int(FILE["Lastlineread"])
-    # print("Last line read from the database:", last_line)
-    # Check if new lines have been added to the log file
-    haveNewLines, lines, lines_lenght = checkNewLines(LATEST_FILE_PATH, last_line)
-
-    # Parse the log file if new lines are found
-    if haveNewLines:
-        Valid, output_json, last_line, new_entries = main(lines, last_line)
-        if Valid: 
-            client = MongoClient(MONGO)
-            db = client[DATABASE_NAME]
-            LOG_COLLECTION = db[LOG_COLLECTION_NAME]
-
-            #print("output_json: ", output_json)
-            result = LOG_COLLECTION.insert_many(json.loads(output_json))
-            #print("Inserted document IDs:", result.inserted_ids)
-        update_file_info(CURRENT_FILE_NAME, new_last_line_read=last_line)
-
-        # output_json, last_line = main(lines, start_line)
     now = datetime.now()
-    print(now, LATEST_FILE_PATH, "\t| Have New Lines: ", haveNewLines , "\t| last line: ", last_line,"\t| new entries: ", new_entries)
-  # Sleep for 5 seconds before checking again
+    print(now, f"[{server_name}]", LATEST_FILE_PATH, "\t| Have New Lines: ", haveNewLines , "\t| last line: ", last_line,"\t| new entries: ", new_entries)
+
+
+def profiled_main_program(source):
+    """main_program, profiled by PROFILER when profiling is enabled."""
+    with PROFILER.profile(source.server_name) if PROFILER is not None else nullcontext():
+        main_program(source)
 
 
 
@@ -254,30 +547,160 @@ if __name__ == '__main__':
 
     load_dotenv()  # <-- THIS MUST BE FIRST THING
 
-    FOLDER_PATH = Path(os.getenv("FOLDER_PATH"))
+    # SOURCES_FILE lists the (folder, server) pairs to ingest. Without it, the single
+    # FOLDER_PATH is ingested as SERVER_NAME.
+    SOURCES = load_sources(os.getenv("SOURCES_FILE"), os.getenv("FOLDER_PATH"), os.getenv("SERVER_NAME", "US"))
     MONGO = str(os.getenv("MONGO"))
-    client = MongoClient(MONGO)
+    # A single pooled client is shared by the bookkeeping queries and the log writers
+    client = MongoClient(MONGO, maxPoolSize=int(os.getenv("MONGO_POOL_SIZE", "10")))
 
     DATABASE_NAME = 'LogParser'
     FILE_COLLECTION = 'FileInfo'
     LOG_COLLECTION_NAME = "LogEntries"
-
-    CURRENT_FILE_NAME = None
-
-    if not FOLDER_PATH.is_dir():
-        print(f"Invalid folder path: {FOLDER_PATH}")
+    TRACE_COLLECTION_NAME = "StackTraces"
+    ROLLUP_COLLECTION_NAME = "LogRollups"
+
+    # FileInfo documents are read once and kept in memory (CHECKPOINT_CACHE=0 to read them every cycle).
+    # Checkpoint updates are written through, or coalesced and written every CHECKPOINT_FLUSH_INTERVAL seconds.
+    CHECKPOINT_CACHE = None
+    if os.getenv("CHECKPOINT_CACHE", "1") == "1":
+        CHECKPOINT_CACHE = CheckpointCache(client[DATABASE_NAME][FILE_COLLECTION],
+                                           flush_interval=float(os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0")))
+    # Maximum characters kept for a single entry (huge stack traces get truncated), 0 for no cap
+    MAX_ENTRY_SIZE = int(os.getenv("MAX_ENTRY_SIZE", "1048576")) or None
+    # The last entry of a poll may still be being written: it is held back until the next entry starts or
+    # the file has been quiet for OPEN_ENTRY_TIMEOUT seconds (0 to write it right away)
+    OPEN_ENTRY_TIMEOUT = float(os.getenv("OPEN_ENTRY_TIMEOUT", "5"))
+    # LOG_COLLECTION_LAYOUT: regular (Timestamp and Server+Controller+Timestamp indexes) or timeseries
+    # (a time-series collection on Timestamp, created if the collection doesn't exist yet).
+    # LOG_RETENTION_DAYS: entries older than that are deleted by MongoDB (TTL), 0 to keep them.
+    LOG_COLLECTION_LAYOUT = os.getenv("LOG_COLLECTION_LAYOUT", "regular")
+    LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "0"))
+    # Number of parsed entries held in memory before they are inserted
+    BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1000"))
+    WRITE_RETRIES = int(os.getenv("WRITE_RETRIES", "3"))
+    # Hold parsed entries as compact LogRecords until they are written (see benchmark.py records)
+    COMPACT_RECORDS = os.getenv("COMPACT_RECORDS", "0") == "1"
+    # Store each unique stack trace once in TRACE_COLLECTION_NAME; entries get its StackTraceId instead.
+    # TRACE_CACHE_SIZE fingerprints known to be stored are remembered, so their repeats cost no round trip.
+    TRACE_STORE = None
+    if os.getenv("DEDUPE_STACK_TRACES", "0") == "1":
+        TRACE_STORE = TraceStore(client[DATABASE_NAME][TRACE_COLLECTION_NAME],
+                                 cache_size=int(os.getenv("TRACE_CACHE_SIZE", "10000")))
+    # Count the written entries per time bucket (ROLLUP_BUCKET_MINUTES), Server, Controller, Action and
+    # HTTPStatusCode in memory, and $inc them into ROLLUP_COLLECTION_NAME every ROLLUP_INTERVAL seconds
+    ROLLUP = None
+    if os.getenv("ROLLUPS", "0") == "1":
+        ROLLUP = RollupCounter(client[DATABASE_NAME][ROLLUP_COLLECTION_NAME],
+                               bucket_minutes=int(os.getenv("ROLLUP_BUCKET_MINUTES", "1")))
+    # SPOOL_PATH: SQLite file where parsed entries and checkpoints are committed together before a
+    # drainer thread sends them to Mongo, keyed by ErrorCode. Empty to write to Mongo directly.
+    SPOOL = Spool(os.getenv("SPOOL_PATH")) if os.getenv("SPOOL_PATH") else None
+    # SEARCH_STORE_PATH: also keep the written entries in a local SQLite file indexed for triage
+    # (URL, User, RemoteHost, ErrorCode, full-text StackTrace), searched with `python batch.py query`
+    SEARCH_STORE = SearchStore(os.getenv("SEARCH_STORE_PATH")) if os.getenv("SEARCH_STORE_PATH") else None
+    # STORM_CONTROL=1: during error storms, keep the first STORM_LIMIT entries of a key per STORM_WINDOW_MINUTES
+    # window, then one in every STORM_SAMPLE_EVERY (0: none). STORM_KEY: route (Server, Controller, Action,
+    # HTTPStatusCode) or signature (Server, stack trace fingerprint). Kept entries carry the "Suppressed" count.
+    STORM_CONTROL = None
+    if os.getenv("STORM_CONTROL", "0") == "1":
+        STORM_CONTROL = StormControl(limit=int(os.getenv("STORM_LIMIT", "100")),
+                                     window_minutes=int(os.getenv("STORM_WINDOW_MINUTES", "1")),
+                                     sample_every=int(os.getenv("STORM_SAMPLE_EVERY", "100")),
+                                     key=os.getenv("STORM_KEY", "route"))
+    # METRICS_PORT: serve stage timings, counts and lag at http://METRICS_HOST:METRICS_PORT/metrics
+    # (Prometheus text format). STATS_FILE: also write them to a JSON file every STATS_INTERVAL seconds.
+    METRICS = None
+    if os.getenv("METRICS_PORT") or os.getenv("STATS_FILE"):
+        METRICS = Metrics()
+    # Worker processes used to parse a backlog of at least PARALLEL_THRESHOLD bytes, 1 to disable
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+    PARALLEL_THRESHOLD = int(os.getenv("PARALLEL_THRESHOLD", str(64 * 1024 * 1024)))
+    # PIPELINE=1: overlap reading, parsing and writing of the new lines. A reader thread feeds batches of
+    # BATCH_SIZE entries through bounded queues to PIPELINE_WORKERS parsers (PIPELINE_POOL: thread or process)
+    # and the writer, PIPELINE_QUEUE_SIZE batches deep. Backlogs of PARALLEL_THRESHOLD bytes still use PARSE_WORKERS.
+    PIPELINE = None
+    if os.getenv("PIPELINE", "0") == "1":
+        PIPELINE = Pipeline(workers=int(os.getenv("PIPELINE_WORKERS", "2")), kind=os.getenv("PIPELINE_POOL", "thread"),
+                            queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "4")))
+    # PROFILE_DIR: profile one cycle in every PROFILE_EVERY (10) with cProfile (and tracemalloc, PROFILE_MEMORY=1)
+    # and write a .prof file and a text report there when the cycle took at least PROFILE_THRESHOLD seconds.
+    # Every sampled cycle runs under the profiler, whether its report is written or not.
+    # The PROFILE_KEEP newest reports are kept.
+    PROFILER = None
+    if os.getenv("PROFILE_DIR"):
+        PROFILER = CycleProfiler(os.getenv("PROFILE_DIR"), every=int(os.getenv("PROFILE_EVERY", "10")),
+                                 threshold=float(os.getenv("PROFILE_THRESHOLD", "0")),
+                                 keep=int(os.getenv("PROFILE_KEEP", "20")),
+                                 trace_memory=os.getenv("PROFILE_MEMORY", "0") == "1")
+    # Number of sources processed at the same time
+    WORKERS = int(os.getenv("WORKERS", str(min(len(SOURCES), 8) or 1)))
+
+    if not SOURCES:
+        print("No sources configured: set FOLDER_PATH or SOURCES_FILE.")
         exit(1)
 
-    print(f"FOLDER_PATH: {FOLDER_PATH}")
+    for source in SOURCES:
+        if not source.folder_path.is_dir():
+            print(f"Invalid folder path: {source.folder_path}")
+            exit(1)
+        # Each source buffers its own batches; the pooled client is shared
+        source.writer = new_log_writer()
+        print(f"Source: {source.server_name} -> {source.folder_path}")
     print(f"MONGO: {MONGO}")
+
+    # FileInfo documents written before multi-source support belong to the previously hard-coded server
+    migrate_file_info(os.getenv("SERVER_NAME", "US"))
+    ensure_log_collection(LOG_COLLECTION_LAYOUT, LOG_RETENTION_DAYS)
+    if CHECKPOINT_CACHE is not None and CHECKPOINT_CACHE.flush_interval > 0:
+        CHECKPOINT_CACHE.start()
+    if TRACE_STORE is not None:
+        try:
+            client[DATABASE_NAME][LOG_COLLECTION_NAME].create_index("StackTraceId")
+        except Exception as e:
+            print(f"Error creating the StackTraceId index: {e}")
+    if ROLLUP is not None:
+        ROLLUP.ensure_indexes()
+        ROLLUP.start(float(os.getenv("ROLLUP_INTERVAL", "10")))
+    if os.getenv("METRICS_PORT"):
+        METRICS.serve(int(os.getenv("METRICS_PORT")), os.getenv("METRICS_HOST", "127.0.0.1"))
+        print(f"Metrics: http://{os.getenv('METRICS_HOST', '127.0.0.1')}:{os.getenv('METRICS_PORT')}/metrics")
+    if os.getenv("STATS_FILE"):
+        METRICS.start_stats_file(os.getenv("STATS_FILE"), float(os.getenv("STATS_INTERVAL", "15")))
+    if SPOOL is not None:
+        print(f"Spool: {os.getenv('SPOOL_PATH')}, {SPOOL.pending()} entries waiting for MongoDB")
+        SPOOL.start(new_log_writer(), apply_spooled_checkpoint)
+
     # Initial main program call
     print("Starting log file monitoring...")
-    main_program(FOLDER_PATH, MONGO, DATABASE_NAME, LOG_COLLECTION_NAME)
-    print("Initial main program call completed.")
-    
-
-    schedule.every(15).seconds.do(lambda: main_program(FOLDER_PATH, MONGO, DATABASE_NAME, LOG_COLLECTION_NAME))
-    #print(f"Scheduled jobs: {schedule.jobs}")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    scheduler = SourceScheduler(profiled_main_program, WORKERS)
+    for source in SOURCES:
+        scheduler.trigger(source)
+
+    # Process a source as soon as one of its errors_*.log files is created or modified instead
+    # of polling every 15 s. One watcher thread per folder; processing happens on the worker pool.
+    # WATCH_MODE: auto (inotify, falling back to stat polling), inotify or poll
+    def watch_sources(folder, folder_sources):
+        def on_change(changed_files):
+            for source in folder_sources:
+                scheduler.trigger(source)
+
+        watch_folder(folder, on_change,
+                     mode=os.getenv("WATCH_MODE", "auto"),
+                     debounce=float(os.getenv("WATCH_DEBOUNCE", "0.5")),
+                     max_delay=float(os.getenv("WATCH_MAX_DELAY", "5")),
+                     poll_interval=float(os.getenv("POLL_INTERVAL", "1")))
+
+    folders = {}
+    for source in SOURCES:
+        folders.setdefault(source.folder_path.resolve(), []).append(source)
+    for folder, folder_sources in folders.items():
+        threading.Thread(target=watch_sources, args=(folder, folder_sources), daemon=True).start()
+
+    # Drain every older file that is not done or is behind its end of file. The catch-up has its
+    # own small pool (BACKFILL_WORKERS), so the live tail of today's files keeps priority.
+    # It runs at startup and again every BACKFILL_INTERVAL seconds (0 for startup only).
+    catch_up = CatchUp(find_unfinished_files, drain_file, max_workers=int(os.getenv("BACKFILL_WORKERS", "1")))
+    catch_up.start(SOURCES, interval=float(os.getenv("BACKFILL_INTERVAL", "3600")))
+
+    threading.Event().wait()
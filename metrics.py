@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+
+
+# Upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "errorlogparser_stage_seconds": ("histogram", "Time spent per ingest cycle in each stage (scan, read, split, parse, write, checkpoint)."),
+    "errorlogparser_lines_total": ("counter", "Log lines read."),
+    "errorlogparser_bytes_total": ("counter", "Log bytes read."),
+    "errorlogparser_entries_total": ("counter", "Parsed entries written."),
+    "errorlogparser_rejected_entries_total": ("counter", "Entries dropped because parse_log_entry returned None."),
+    "errorlogparser_suppressed_entries_total": ("counter", "Entries dropped by storm control, counted in the Suppressed field of the kept entries."),
+    "errorlogparser_lag_bytes": ("gauge", "Bytes of the latest log file not ingested yet (file end minus checkpoint)."),
+}
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and histograms of the ingestion pipeline.
+
+    They are exposed in the Prometheus text format on a localhost HTTP endpoint (serve) and can
+    be written periodically to a JSON stats file (start_stats_file).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.gauges = {}
+        # (name, labels) -> [count per bucket, sum, count]
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def time(self, stage: str, **labels) -> "_Timed":
+        """Context manager observing the duration of a block in errorlogparser_stage_seconds."""
+        return _Timed(self, stage, labels)
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        def format_labels(labels, extra=()):
+            pairs = [f'{key}="{_escape(value)}"' for key, value in tuple(labels) + tuple(extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        with self.lock:
+            samples = {}
+            for (name, labels), value in list(self.counters.items()) + list(self.gauges.items()):
+                samples.setdefault(name, []).append(f"{name}{format_labels(labels)} {value}")
+            for (name, labels), (bucket_counts, total, count) in self.histograms.items():
+                lines = samples.setdefault(name, [])
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {bucket_count}")
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        output = []
+        for name, lines in samples.items():
+            metric_type, help_text = METRIC_HELP.get(name, ("untyped", name))
+            output += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"] + lines
+        return "\n".join(output) + "\n"
+
+    def snapshot(self) -> dict:
+        """Returns the metrics as a JSON-serializable dictionary."""
+        def entries(items):
+            return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in items]
+
+        with self.lock:
+            return {
+                "time": time.time(),
+                "counters": entries(self.counters.items()),
+                "gauges": entries(self.gauges.items()),
+                "histograms": [{"name": name, "labels": dict(labels), "buckets": dict(zip(self.buckets, bucket_counts)),
+                                "sum": total, "count": count}
+                               for (name, labels), (bucket_counts, total, count) in self.histograms.items()],
+            }
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serves the metrics on http://host:port/metrics from a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def write_stats_file(self, path) -> None:
+        """Writes the snapshot to a JSON file, replacing it atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, path)
+
+    def start_stats_file(self, path, interval: float = 15.0) -> threading.Thread:
+        """Writes the JSON stats file every `interval` seconds in a background thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_stats_file(path)
+                except OSError as e:
+                    print(f"Error writing the stats file {path}: {e}")
+
+        thread = threading.Thread(target=loop, name="stats-file", daemon=True)
+        thread.start()
+        return thread
+
+
+def _escape(value) -> str:
+    """Escapes a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Timed:
+    def __init__(self, metrics: Metrics, stage: str, labels: dict):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe("errorlogparser_stage_seconds", time.perf_counter() - self.started, stage=self.stage, **self.labels)
+        return False
+
+
+class StageTimer:
+    """
+    Times the stages of a streamed pipeline (lines -> entries -> parsed entries).
+
+    The stages are generators pulling from each other, so each one is wrapped and the time spent
+    in its next() is accumulated. That time includes the upstream stages; the time of a stage on
+    its own is its total minus the total of the stage before it.
+    """
+
+    def __init__(self):
+        # [stage, seconds including upstream stages, items]
+        self.stages = []
+
+    def wrap(self, iterable, stage: str, chunk_size: int = 1):
+        """
+        Returns the iterable, timed as `stage`. With chunk_size, items are pulled chunk_size at a time
+        and the clock is read once per chunk, which keeps the cost low for cheap items such as lines.
+        """
+        record = [stage, 0.0, 0]
+        self.stages.append(record)
+        return self._timed(iter(iterable), record, chunk_size)
+
+    @staticmethod
+    def _timed(iterator, record, chunk_size):
+        perf_counter = time.perf_counter
+        if chunk_size > 1:
+            while True:
+                started = perf_counter()
+                chunk = list(islice(iterator, chunk_size))
+                record[1] += perf_counter() - started
+                if not chunk:
+                    return
+                record[2] += len(chunk)
+                yield from chunk
+        else:
+            while True:
+                started = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    record[1] += perf_counter() - started
+                    return
+                record[1] += perf_counter() - started
+                record[2] += 1
+                yield item
+
+    def items(self, stage: str) -> int:
+        """Returns the number of items a stage produced."""
+        return next((items for name, _, items in self.stages if name == stage), 0)
+
+    def total(self) -> float:
+        """Returns the time spent in the last stage, including all the stages before it."""
+        return self.stages[-1][1] if self.stages else 0.0
+
+    def exclusive(self) -> list[tuple[str, float]]:
+        """Returns (stage, seconds spent in that stage alone) for each stage, upstream first."""
+        result = []
+        upstream = 0.0
+        for stage, seconds, _ in self.stages:
+            result.append((stage, max(seconds - upstream, 0.0)))
+            upstream = seconds
+        return result
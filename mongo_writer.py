@@ -0,0 +1,130 @@
+import time
+
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
+
+from log_record import to_document
+
+
+# Error code MongoDB returns when a document with the same _id already exists
+DUPLICATE_KEY_ERROR = 11000
+
+
+class MongoBulkWriter:
+    """
+    Writes parsed log entries to a MongoDB collection in batches.
+
+    The writer is created once and reuses the pooled MongoClient behind the collection.
+    Records are taken directly as dicts or LogRecords (no serialization step) and buffered up to
+    batch_size, then flushed with an unordered bulk write. A batch that fails with a
+    transient error is retried on its own; documents of that batch that were already
+    inserted are recognised by their _id and not inserted twice.
+    With a trace_store, documents reference their stack trace by fingerprint instead of carrying it.
+    With a rollup, the written documents are counted into its time-bucketed counters.
+    With a search_store, a copy of each written batch is also kept in that local SQLite store.
+    """
+
+    def __init__(self, collection, batch_size: int = 1000, max_retries: int = 3, retry_delay: float = 1.0,
+                 trace_store=None, rollup=None, search_store=None):
+        """
+        Args:
+            collection: The pymongo collection to write to.
+            batch_size (int): Number of records sent per bulk write.
+            max_retries (int): Number of times a failed batch is retried before giving up.
+            retry_delay (float): Seconds to wait before the first retry, doubled after each attempt.
+            trace_store (TraceStore | None): Store the unique stack traces are moved to.
+            rollup (RollupCounter | None): Counters the written documents are added to.
+            search_store (SearchStore | None): Local store the documents are copied to.
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.trace_store = trace_store
+        self.rollup = rollup
+        self.search_store = search_store
+        self.batch = []
+        self.written = 0
+
+    def add(self, record: dict) -> None:
+        """Buffers a record and flushes the batch once it is full."""
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, records) -> int:
+        """
+        Writes every record of an iterable (typically a generator) and flushes the remainder.
+
+        Returns:
+            int: The number of records written by this call.
+        """
+        written_before = self.written
+        for record in records:
+            self.add(record)
+        self.flush()
+        return self.written - written_before
+
+    def flush(self) -> None:
+        """
+        Sends the buffered records as one unordered bulk write, retrying transient failures.
+        Raises the last error if the batch still fails after max_retries attempts.
+        """
+        if not self.batch:
+            return
+
+        # LogRecords become documents only here, so the buffered batch stays compact
+        documents = [to_document(record) for record in self.batch]
+        search_documents = documents
+        if self.trace_store is not None:
+            if self.search_store is not None:
+                # The search store keeps the stack traces the trace store moves out
+                search_documents = [dict(document) for document in documents]
+            self.trace_store.dedupe(documents)
+        requests = [InsertOne(document) for document in documents]
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.collection.bulk_write(requests, ordered=False)
+                break
+            except BulkWriteError as e:
+                # On a retry, documents inserted by the previous attempt come back as duplicates
+                errors = e.details.get("writeErrors", [])
+                if errors and all(error.get("code") == DUPLICATE_KEY_ERROR for error in errors):
+                    break
+                if attempt == self.max_retries or not self._is_transient(e):
+                    raise
+                print(f"Bulk write failed ({e}), retrying {attempt + 1}/{self.max_retries}...")
+            except (ConnectionFailure, OperationFailure) as e:
+                if attempt == self.max_retries or not self._is_transient(e):
+                    raise
+                print(f"Bulk write failed ({e}), retrying {attempt + 1}/{self.max_retries}...")
+            time.sleep(delay)
+            delay *= 2
+
+        # Counted once written, so a batch that fails and is read again is not counted twice
+        if self.rollup is not None:
+            self.rollup.add_all(documents)
+        if self.search_store is not None:
+            # The local copy is best effort: a locked or full store must not stop the ingestion into Mongo.
+            # The store ignores entries it already has.
+            try:
+                self.search_store.write_all(search_documents)
+            except Exception as e:
+                print(f"Error copying {len(search_documents)} entries to the search store: {e}")
+        self.written += len(self.batch)
+        self.batch = []
+
+    def discard(self) -> None:
+        """Drops the buffered records, e.g. after a flush failed for good."""
+        self.batch = []
+
+    @staticmethod
+    def _is_transient(error) -> bool:
+        """Network errors and errors labelled retryable by the server are worth retrying."""
+        if isinstance(error, ConnectionFailure):
+            return True
+        if isinstance(error, BulkWriteError):
+            # Only write concern or server-side transient errors; a bad document would fail again
+            return not error.details.get("writeErrors")
+        return error.has_error_label("RetryableWriteError")
@@ -0,0 +1,131 @@
+import io
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from parse_log_entries import iter_parse_entries
+from split_entries import iter_split_entries
+
+
+# Same entry start as split_entries.log_start_pattern, preceded by the end of the previous line
+entry_boundary_pattern = re.compile(rb"\n\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+ ERROR Guid")
+
+
+def find_chunk_boundaries(input_log_filepath, start_offset: int, end_offset: int, chunk_size: int) -> list[int]:
+    """
+    Cuts a byte range of a log file into chunks that start at an ERROR Guid entry boundary.
+
+    The file is memory-mapped and, every chunk_size bytes, searched forward for the next entry
+    start. No entry is ever split across two chunks, so each chunk can be parsed independently.
+
+    Returns:
+        list[int]: Sorted offsets, starting with start_offset and ending with end_offset.
+    """
+    boundaries = [start_offset]
+    if end_offset - start_offset <= chunk_size:
+        return boundaries + [end_offset]
+
+    with open(input_log_filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = start_offset + chunk_size
+            while position < end_offset:
+                match = entry_boundary_pattern.search(mm, position - 1, end_offset)
+                if not match:
+                    break
+                boundary = match.start() + 1
+                boundaries.append(boundary)
+                position = boundary + chunk_size
+
+    boundaries.append(end_offset)
+    return boundaries
+
+
+def find_last_entry_start(input_log_filepath, start_offset: int, end_offset: int) -> int:
+    """
+    Returns the offset of the last ERROR Guid entry start in a byte range of a log file,
+    or start_offset if the range has none after its first line.
+    """
+    if end_offset <= start_offset:
+        return start_offset
+    with open(input_log_filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = end_offset
+            while True:
+                index = mm.rfind(b" ERROR Guid", start_offset, position)
+                if index == -1:
+                    return start_offset
+                line_start = max(mm.rfind(b"\n", start_offset, index) + 1, start_offset)
+                if line_start > start_offset and entry_boundary_pattern.match(mm, line_start - 1, end_offset):
+                    return line_start
+                position = index
+
+
+def parse_chunk(input_log_filepath, start_offset: int, end_offset: int, server_name: str, max_entry_size=None,
+                compact: bool = False):
+    """
+    Parses the entries of one entry-aligned chunk. Runs in a worker process.
+
+    Returns:
+        tuple[list[dict | LogRecord], int]: The valid parsed entries, in file order, and the number of lines in the chunk.
+    """
+    with open(input_log_filepath, 'rb') as f:
+        f.seek(start_offset)
+        data = f.read(end_offset - start_offset)
+
+    lines = []
+    for raw_line in io.BytesIO(data):
+        # Match LogTail line endings and decoding
+        if raw_line.endswith(b"\r\n"):
+            raw_line = raw_line[:-2] + b"\n"
+        lines.append(raw_line.decode('utf-8', errors='replace'))
+
+    entries = list(iter_parse_entries(iter_split_entries(lines, max_entry_size), server_name, compact))
+    return entries, len(lines)
+
+
+def parallel_parse_tail(tail, server_name: str, workers: int | None = None, chunk_size: int = 8 * 1024 * 1024,
+                        max_entry_size=None, compact: bool = False):
+    """
+    Parallel version of main.main for a LogTail: parses entry-aligned chunks in a process pool.
+
+    Entries are yielded in file order with the same content and count as the serial path.
+    At most two chunks per worker are in flight, so memory stays bounded by the chunk size.
+    As chunks are yielded, tail.offset and tail.lines_read are advanced like a serial read.
+
+    Args:
+        tail (LogTail): The byte range to parse.
+        server_name (str): The name of the server to associate with each log entry.
+        workers (int | None): Number of worker processes, defaults to the number of cores.
+        chunk_size (int): Approximate number of bytes per chunk.
+        max_entry_size (int | None): Maximum number of characters kept for a single entry.
+        compact (bool): Parse into LogRecord objects, which are also cheaper to send back from the workers.
+
+    Yields:
+        dict | LogRecord: The parsed log entries.
+    """
+    workers = workers or os.cpu_count() or 1
+    boundaries = find_chunk_boundaries(tail.input_log_filepath, tail.offset, tail.end_offset, chunk_size)
+    chunks = iter(zip(boundaries, boundaries[1:]))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is not None:
+                chunk_start, chunk_end = chunk
+                in_flight.append((chunk_end, pool.submit(parse_chunk, tail.input_log_filepath, chunk_start,
+                                                         chunk_end, server_name, max_entry_size, compact)))
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while in_flight:
+            chunk_end, future = in_flight.popleft()
+            entries, lines_read = future.result()
+            submit_next()
+            yield from entries
+            tail.offset = chunk_end
+            tail.lines_read += lines_read
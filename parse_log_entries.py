@@ -1,3 +1,7 @@
+import datetime
+
+from log_record import LogRecord
+
 
 # --- Start of log_parser.py (Updated to extract UTC and accept server_name) ---
 def parse_log_entry(log_entry_string: str, server_name: str = "") -> dict | None:
@@ -174,4 +178,84 @@ def parse_log_entry(log_entry_string: str, server_name: str = "") -> dict | None
     # Return the dictionary containing the extracted data.
     # We don't filter by ErrorCode here; the caller will do that based on parse_log_entry returning None.
     return extracted_data
+
+
+# Minute prefix of a timestamp -> datetime of that minute; entries of the same minute share one strptime
+_server_minutes = {}
+_utc_minutes = {}
+
+# Distinct minutes remembered, so a long-running process doesn't grow forever
+MAX_CACHED_MINUTES = 10000
+
+
+def _cached_minute(cache: dict, key, text: str, date_format: str) -> datetime.datetime | None:
+    start = cache.get(key)
+    if start is None:
+        try:
+            start = datetime.datetime.strptime(text, date_format)
+        except ValueError:
+            return None
+        if len(cache) >= MAX_CACHED_MINUTES:
+            cache.clear()
+        cache[key] = start
+    return start
+
+
+def parse_server_timestamp(server_date_time: str) -> datetime.datetime | None:
+    """Returns the datetime of a ServerDateTime ("2025-01-01 00:41:25.7527"), None if malformed."""
+    minute = server_date_time[:16]
+    start = _cached_minute(_server_minutes, minute, minute, "%Y-%m-%d %H:%M")
+    if start is None:
+        return None
+    seconds, _, fraction = server_date_time[17:].partition(".")
+    try:
+        return start.replace(second=int(seconds), microsecond=int(fraction[:6].ljust(6, "0")) if fraction else 0)
+    except ValueError:
+        return None
+
+
+def parse_utc_timestamp(utc_date: str, utc_time: str) -> datetime.datetime | None:
+    """Returns the datetime of a UTC Date ("1/1/2025") and UTC Time ("3:00:00 PM"), None if missing or malformed."""
+    if not utc_date or not utc_time:
+        return None
+    hour_minute, _, rest = utc_time.rpartition(":")
+    seconds, _, meridiem = rest.partition(" ")
+    if meridiem:
+        start = _cached_minute(_utc_minutes, (utc_date, hour_minute, meridiem), f"{utc_date} {hour_minute} {meridiem}",
+                               "%m/%d/%Y %I:%M %p")
+    else:
+        start = _cached_minute(_utc_minutes, (utc_date, hour_minute), f"{utc_date} {hour_minute}", "%m/%d/%Y %H:%M")
+    if start is None:
+        return None
+    seconds, _, fraction = seconds.partition(".")
+    try:
+        return start.replace(second=int(seconds), microsecond=int(fraction[:6].ljust(6, "0")) if fraction else 0)
+    except ValueError:
+        return None
+
+
+def iter_parse_entries(entries, server_name: str = "", compact: bool = False):
+    """
+    Streaming version of map(parse_log_entry, ...): parses entries one at a time
+    and yields only the valid ones.
+
+    Args:
+        entries (Iterable[tuple[str, bool]]): (entry string, truncated) pairs as yielded
+                                              by split_entries.iter_split_entries.
+        server_name (str): The name of the server to associate with each log entry.
+        compact (bool): Yield LogRecord objects instead of dicts, to hold large batches in less memory.
+
+    Yields:
+        dict | LogRecord: The extracted log data. Entries cut by the size cap get "Truncated": True.
+                          The text timestamps are also parsed into the Timestamp and UTCTimestamp datetimes.
+    """
+    for entry_string, truncated in entries:
+        extracted_data = parse_log_entry(entry_string, server_name)
+        if extracted_data is None:
+            continue
+        extracted_data["Timestamp"] = parse_server_timestamp(extracted_data["ServerDateTime"])
+        extracted_data["UTCTimestamp"] = parse_utc_timestamp(extracted_data["UTC Date"], extracted_data["UTC Time"])
+        if truncated:
+            extracted_data["Truncated"] = True
+        yield LogRecord.from_dict(extracted_data) if compact else extracted_data
 # --- End of log_parser.py ---
\ No newline at end of file
@@ -0,0 +1,153 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from parse_log_entries import iter_parse_entries
+from split_entries import iter_split_entries
+
+
+# Marks the end of a queue
+_DONE = object()
+
+
+def parse_batch(entries: list[str], server_name: str, compact: bool = False) -> list:
+    """Parses a batch of entry strings. Runs in the parser pool, possibly in a worker process."""
+    return list(iter_parse_entries(entries, server_name, compact))
+
+
+class _Failed:
+    """Carries an exception of the reader or parser stage to the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Pipeline:
+    """
+    Overlaps reading, parsing and writing of the new lines of a log file.
+
+    A reader thread reads and splits the lines into batches of entry strings, a pool of threads
+    or processes parses the batches, and the thread consuming the entries (the writer) inserts
+    them. The stages are connected by bounded queues: a stage that gets ahead blocks once its
+    queue is full, so memory stays bounded and throughput approaches that of the slowest stage
+    instead of the sum of all stages. Entries come out in file order.
+
+    The pool is created once and shared by all sources.
+    """
+
+    def __init__(self, workers: int = 2, kind: str = "thread", queue_size: int = 4):
+        """
+        Args:
+            workers (int): Number of parser threads or processes.
+            kind (str): "thread", or "process" to parse outside the GIL (entries are pickled both ways).
+            queue_size (int): Batches buffered between two stages, and batches in flight per parser.
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pipeline parser pool: {kind}")
+        self.workers = max(workers, 1)
+        self.kind = kind
+        self.queue_size = max(queue_size, 1)
+        if kind == "process":
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline-parse")
+
+    def entries(self, tail, server_name: str, batch_size: int = 1000, max_entry_size=None, compact: bool = False,
+                split=None):
+        """
+        Pipelined version of main.main for a LogTail.
+
+        tail.offset and tail.lines_read are final once the generator is exhausted. If the consumer
+        stops early or raises, the reader and parser stages are stopped before the generator closes.
+
+        Args:
+            tail (LogTail): The lines to ingest.
+            server_name (str): The name of the server to associate with each log entry.
+            batch_size (int): Number of entry strings per parse task.
+            max_entry_size (int | None): Maximum number of characters kept for a single entry.
+            compact (bool): Parse into LogRecord objects, which are also cheaper to send back from worker processes.
+            split: Replaces iter_split_entries, e.g. with the split of an EntrySplitter.
+
+        Yields:
+            dict | LogRecord: The parsed log entries.
+        """
+        stop = threading.Event()
+        max_in_flight = self.workers * self.queue_size
+        raw_batches = queue.Queue(maxsize=self.queue_size)
+        parsed_batches = queue.Queue(maxsize=self.queue_size)
+
+        def put(target, item) -> bool:
+            # Blocks while the queue is full, unless the pipeline is stopped
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read():
+            try:
+                batch = []
+                for entry in split(tail) if split is not None else iter_split_entries(tail, max_entry_size):
+                    batch.append(entry)
+                    if len(batch) >= batch_size:
+                        if not put(raw_batches, batch):
+                            return
+                        batch = []
+                if batch and not put(raw_batches, batch):
+                    return
+                put(raw_batches, _DONE)
+            except BaseException as e:
+                put(raw_batches, _Failed(e))
+
+        def parse():
+            in_flight = deque()
+            reading_done = False
+            try:
+                while not stop.is_set():
+                    # Hand the oldest batch to the writer once parsed, keeping the other parsers busy meanwhile
+                    if in_flight and (reading_done or in_flight[0].done() or len(in_flight) >= max_in_flight):
+                        if not put(parsed_batches, in_flight.popleft().result()):
+                            return
+                        continue
+                    if reading_done:
+                        put(parsed_batches, _DONE)
+                        return
+                    try:
+                        item = raw_batches.get(timeout=0.01 if in_flight else 0.1)
+                    except queue.Empty:
+                        continue
+                    if item is _DONE:
+                        reading_done = True
+                    elif isinstance(item, _Failed):
+                        put(parsed_batches, item)
+                        return
+                    else:
+                        in_flight.append(self.pool.submit(parse_batch, item, server_name, compact))
+            except BaseException as e:
+                put(parsed_batches, _Failed(e))
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+        reader = threading.Thread(target=read, name=f"pipeline-read-{server_name}", daemon=True)
+        parser = threading.Thread(target=parse, name=f"pipeline-parse-{server_name}", daemon=True)
+        reader.start()
+        parser.start()
+        try:
+            while True:
+                batch = parsed_batches.get()
+                if batch is _DONE:
+                    break
+                if isinstance(batch, _Failed):
+                    raise batch.error
+                yield from batch
+        finally:
+            stop.set()
+            reader.join()
+            parser.join()
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,122 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class CycleProfiler:
+    """
+    Profiles ingest cycles with cProfile and, optionally, tracemalloc.
+
+    Every `every`-th cycle is profiled. Its report is written only if the cycle took at least
+    `threshold` seconds: the threshold only filters the reports, every sampled cycle still pays
+    the full cost of profiling (several times slower with tracemalloc), so keep `every` high.
+    The report is a timestamped .prof file (for pstats, snakeviz...) and a .txt file with the
+    top functions by cumulative time and the top allocations of the cycle.
+    Only the `keep` newest reports are kept in the directory.
+
+    One cycle is profiled at a time; cycles of other sources starting meanwhile are not selected.
+    tracemalloc is process-wide, so the memory report includes the allocations of every thread.
+    Before Python 3.12, cProfile only sees the thread of the cycle, so work done in other threads
+    (parser pools, the spool drainer, other sources) is not in the .prof file. From 3.12 cProfile
+    uses sys.monitoring, which is process-wide: the .prof file then also holds the work of every
+    other thread running during the cycle. Work done in worker processes is never in it.
+    """
+
+    def __init__(self, directory, every: int = 1, threshold: float = 0.0, keep: int = 20, trace_memory: bool = False,
+                 top: int = 30):
+        """
+        Args:
+            directory (str): Directory the reports are written to, created if missing.
+            every (int): Profile one cycle in every `every`.
+            threshold (float): Minimum duration in seconds of a cycle for its report to be written.
+            keep (int): Number of reports kept, the oldest are deleted.
+            trace_memory (bool): Also trace allocations with tracemalloc, which slows the cycle down further.
+            top (int): Number of functions and allocation sites listed in the text report.
+        """
+        self.directory = directory
+        self.every = max(every, 1)
+        self.threshold = threshold
+        self.keep = keep
+        self.trace_memory = trace_memory
+        self.top = top
+        self.cycles = 0
+        self.lock = threading.Lock()
+        self.busy = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def profile(self, name: str):
+        """Profiles the block as one cycle called `name` (e.g. the server name), if it is selected."""
+        with self.lock:
+            self.cycles += 1
+            selected = self.cycles % self.every == 0
+        if not selected or not self.busy.acquire(blocking=False):
+            yield
+            return
+
+        try:
+            profiler = cProfile.Profile()
+            start_snapshot = None
+            # Tracing started elsewhere (PYTHONTRACEMALLOC) is left running
+            was_tracing = tracemalloc.is_tracing()
+            if self.trace_memory:
+                if not was_tracing:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                start_snapshot = tracemalloc.take_snapshot()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                seconds = time.perf_counter() - started
+                end_snapshot = peak = None
+                if self.trace_memory:
+                    end_snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    if not was_tracing:
+                        tracemalloc.stop()
+                if seconds >= self.threshold:
+                    try:
+                        self._write(name, seconds, profiler, start_snapshot, end_snapshot, peak)
+                    except OSError as e:
+                        print(f"Error writing the profile of {name}: {e}")
+        finally:
+            self.busy.release()
+
+    def _write(self, name, seconds, profiler, start_snapshot, end_snapshot, peak) -> None:
+        safe_name = re.sub(r"[^\w.-]", "_", name)
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now % 1 * 1000):03d}"
+        base = os.path.join(self.directory, f"{stamp}-{safe_name}-{seconds:.1f}s")
+        profiler.dump_stats(f"{base}.prof")
+
+        output = io.StringIO()
+        output.write(f"{name}: cycle of {seconds:.3f}s\n\n")
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(self.top)
+        if end_snapshot is not None:
+            output.write(f"Peak traced memory: {peak / 1048576:.1f} MB\n")
+            output.write(f"Top {self.top} allocations of the cycle (size and count still allocated at its end):\n")
+            for statistic in end_snapshot.compare_to(start_snapshot, "lineno")[:self.top]:
+                output.write(f"  {statistic}\n")
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write(output.getvalue())
+        print(f"Profile of {name} ({seconds:.1f}s) written to {base}.prof")
+        self._rotate()
+
+    def _rotate(self) -> None:
+        """Deletes the oldest reports beyond `keep`."""
+        reports = sorted(file_name[:-len(".prof")] for file_name in os.listdir(self.directory) if file_name.endswith(".prof"))
+        for base in reports[:max(len(reports) - self.keep, 0)]:
+            for extension in (".prof", ".txt"):
+                try:
+                    os.remove(os.path.join(self.directory, base + extension))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,112 @@
+import datetime
+import threading
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+# Dimensions the entries are counted by, next to the time bucket
+ROLLUP_DIMENSIONS = ("Server", "Controller", "Action", "HTTPStatusCode")
+
+
+class RollupCounter:
+    """
+    Counts the ingested entries per time bucket, Server, Controller, Action and HTTPStatusCode.
+
+    Counters are kept in memory as entries are written and periodically flushed as $inc upserts
+    into a rollup collection, one document per bucket and dimensions:
+        {"Bucket": datetime(2025, 1, 1, 0, 41), "Server": "US", "Controller": "Home",
+         "Action": "Index", "HTTPStatusCode": "500", "Count": 12}
+    Buckets are in server local time, like the ServerDateTime of the entries.
+    Counts not flushed yet are lost if the process is killed.
+    """
+
+    def __init__(self, collection, bucket_minutes: int = 1):
+        """
+        Args:
+            collection: The pymongo collection the rollup documents are upserted into.
+            bucket_minutes (int): Width of a time bucket, in minutes.
+        """
+        self.collection = collection
+        self.bucket_minutes = bucket_minutes
+        self.counts = {}
+        self.lock = threading.Lock()
+        # "YYYY-MM-DD HH:MM" -> bucket start, entries of the same minute share one lookup
+        self.buckets = {}
+
+    def bucket(self, date: str, time_of_day: str) -> datetime.datetime | None:
+        """Returns the start of the bucket of a Date ("2025-01-01") and Time ("00:41:25.7527"), None if malformed."""
+        minute = f"{date} {time_of_day[:5]}"
+        start = self.buckets.get(minute)
+        if start is None:
+            try:
+                start = datetime.datetime.strptime(minute, "%Y-%m-%d %H:%M")
+            except ValueError:
+                return None
+            start -= datetime.timedelta(minutes=(start.hour * 60 + start.minute) % self.bucket_minutes)
+            if len(self.buckets) >= 10000:
+                self.buckets.clear()
+            self.buckets[minute] = start
+        return start
+
+    def add_all(self, documents) -> None:
+        """Counts written entry documents."""
+        batch_counts = {}
+        for document in documents:
+            bucket = self.bucket(document["Date"], document["Time"])
+            if bucket is None:
+                continue
+            key = (bucket,) + tuple(document[dimension] for dimension in ROLLUP_DIMENSIONS)
+            # An entry kept by storm control stands for the entries it suppressed too
+            batch_counts[key] = batch_counts.get(key, 0) + 1 + document.get("Suppressed", 0)
+
+        with self.lock:
+            for key, count in batch_counts.items():
+                self.counts[key] = self.counts.get(key, 0) + count
+
+    def flush(self) -> None:
+        """Sends the pending counters as one unordered bulk of $inc upserts. On failure they are kept for the next flush."""
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        if not counts:
+            return
+
+        requests = [UpdateOne({"Bucket": key[0], **dict(zip(ROLLUP_DIMENSIONS, key[1:]))},
+                              {"$inc": {"Count": count}}, upsert=True)
+                    for key, count in counts.items()]
+        keys = list(counts)
+        try:
+            self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # Only the upserts reported as failed are kept, the others were applied
+            failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+            print(f"Error flushing {len(failed)} rollup counter(s), retrying on the next flush: {e}")
+            self._restore({key: counts[key] for key in failed})
+        except Exception as e:
+            # Outcome unknown (e.g. connection lost): counting some twice is preferred to losing them
+            print(f"Error flushing {len(requests)} rollup counter(s), retrying on the next flush: {e}")
+            self._restore(counts)
+
+    def _restore(self, counts: dict) -> None:
+        with self.lock:
+            for key, count in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + count
+
+    def ensure_indexes(self) -> None:
+        """Indexes the bucket and dimensions, which the upserts and the dashboards query by."""
+        try:
+            self.collection.create_index([("Bucket", 1)] + [(dimension, 1) for dimension in ROLLUP_DIMENSIONS], unique=True)
+        except Exception as e:
+            print(f"Error creating the rollup index: {e}")
+
+    def start(self, interval: float = 10.0) -> threading.Thread:
+        """Flushes the counters every `interval` seconds in a background thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.flush()
+
+        thread = threading.Thread(target=loop, name="rollup-flush", daemon=True)
+        thread.start()
+        return thread
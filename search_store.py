@@ -0,0 +1,163 @@
+import datetime
+import sqlite3
+import threading
+
+from log_record import FIELDS, to_document
+from sinks import Sink
+
+
+# Columns indexed for lookups while triaging
+INDEXED_COLUMNS = ("url", "user", "remote_host", "server_date_time")
+
+COLUMNS = tuple(name for _, name in FIELDS) + ("truncated",)
+
+# Columns holding datetimes, stored as ISO text
+DATETIME_COLUMNS = {"timestamp", "utc_timestamp"}
+
+
+class SearchStore(Sink):
+    """
+    Local SQLite store of parsed entries, indexed for triage lookups.
+
+    Entries get B-tree indexes on ErrorCode (unique per server, so writing the same entries again
+    is a no-op), URL, User, RemoteHost, Controller/Action and ServerDateTime, and a full-text
+    (FTS5) index on StackTrace. It is a sink of the batch CLI and can be fed by the daemon.
+    """
+
+    def __init__(self, path, batch_size: int = 1000):
+        """
+        Args:
+            path (str): Path of the SQLite file, created if missing.
+            batch_size (int): Number of entries inserted per transaction.
+        """
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+
+        column_definitions = ", ".join(f'"{name}" TEXT' for name in COLUMNS[:-1])
+        self.connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, {column_definitions}, truncated INTEGER NOT NULL DEFAULT 0);
+            CREATE UNIQUE INDEX IF NOT EXISTS entries_error_code ON entries (error_code, server);
+            CREATE INDEX IF NOT EXISTS entries_controller_action ON entries (controller, action);
+            {"".join(f'CREATE INDEX IF NOT EXISTS entries_{name} ON entries ("{name}");' for name in INDEXED_COLUMNS)}
+        """)
+        # Stores created before a field was added get its column
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(entries)")}
+        for name in COLUMNS[:-1]:
+            if name not in existing:
+                self.connection.execute(f'ALTER TABLE entries ADD COLUMN "{name}" TEXT')
+        try:
+            self.connection.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(stack_trace, content='entries', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts (rowid, stack_trace) VALUES (new.id, new.stack_trace);
+                END;
+            """)
+            self.full_text = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: stack traces are searched with LIKE
+            print(f"Full-text search not available ({e}), StackTrace searches will scan the entries.")
+            self.full_text = False
+
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        self.insert_sql = f"""INSERT OR IGNORE INTO entries ({", ".join(f'"{name}"' for name in COLUMNS)}) VALUES ({placeholders})"""
+
+    @staticmethod
+    def _row(record) -> tuple:
+        document = to_document(record)
+        row = []
+        for key, _ in FIELDS:
+            value = document.get(key)
+            # Values SQLite has no type for, e.g. dates, are stored as text
+            if value is not None and not isinstance(value, str):
+                value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+            row.append(value)
+        row.append(1 if document.get("Truncated") else 0)
+        return tuple(row)
+
+    def write_all(self, records) -> int:
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(self._row(record))
+            if len(batch) >= self.batch_size:
+                self._insert(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+            count += len(batch)
+        return count
+
+    def _insert(self, batch: list) -> None:
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.executemany(self.insert_sql, batch)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def search(self, error_code=None, url=None, user=None, remote_host=None, controller=None, action=None,
+               server=None, since=None, until=None, stack_trace=None, limit: int = 50) -> list[dict]:
+        """
+        Returns the entries matching all the given filters, newest first.
+
+        Args:
+            error_code, user, remote_host, controller, action, server (str | None): Exact values.
+            url (str | None): URL prefix.
+            since, until (str | None): ServerDateTime bounds, e.g. "2025-01-01" or "2025-01-01 12:00"
+                                       (an ISO "2025-01-01T12:00" is accepted too).
+            stack_trace (str | None): FTS5 query on the stack trace, e.g. "NullReferenceException AND Orders".
+            limit (int): Maximum number of entries returned.
+
+        Returns:
+            list[dict]: The entries, as the documents parse_log_entry produces.
+        """
+        conditions = []
+        parameters = []
+        for column, value in (("error_code", error_code), ("user", user), ("remote_host", remote_host),
+                              ("controller", controller), ("action", action), ("server", server)):
+            if value is not None:
+                conditions.append(f'"{column}" = ?')
+                parameters.append(value)
+        if url is not None:
+            # Prefix match as a range, so the index is used
+            conditions.append("url >= ? AND url < ?")
+            parameters += [url, url + "\uffff"]
+        # ServerDateTime is compared as a string and separates the date and time with a space
+        if since is not None:
+            conditions.append("server_date_time >= ?")
+            parameters.append(since.replace("T", " "))
+        if until is not None:
+            conditions.append("server_date_time < ?")
+            parameters.append(until.replace("T", " "))
+        if stack_trace is not None:
+            if self.full_text:
+                conditions.append("id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+                parameters.append(stack_trace)
+            else:
+                conditions.append("stack_trace LIKE ?")
+                parameters.append(f"%{stack_trace}%")
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        sql = f"""SELECT {", ".join(f'"{name}"' for name in COLUMNS)} FROM entries{where}
+                  ORDER BY server_date_time DESC LIMIT ?"""
+        with self.lock:
+            rows = self.connection.execute(sql, parameters + [limit]).fetchall()
+
+        results = []
+        for row in rows:
+            document = {key: datetime.datetime.fromisoformat(value) if name in DATETIME_COLUMNS and value else value
+                        for (key, name), value in zip(FIELDS, row)}
+            if row[-1]:
+                document["Truncated"] = True
+            results.append(document)
+        return results
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
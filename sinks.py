@@ -0,0 +1,90 @@
+import json
+import sys
+
+from log_record import to_document
+
+
+class Sink:
+    """
+    Destination of parsed log entries.
+
+    write_all takes any iterable of dicts or LogRecords (typically a generator) and returns the
+    number of entries written; close flushes and releases the destination.
+    """
+
+    def write_all(self, records) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _json_default(value):
+    # Dates and other values JSON has no type for
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class NdjsonSink(Sink):
+    """
+    Writes one compact JSON document per line (newline-delimited JSON), as the entries stream in.
+    Nothing is held in memory besides the output buffer. "-" writes to stdout.
+    """
+
+    def __init__(self, path, buffer_size: int = 1024 * 1024):
+        """
+        Args:
+            path (str): Output file, or "-" for stdout.
+            buffer_size (int): Size of the output buffer in bytes.
+        """
+        if path == "-":
+            self.file = sys.stdout
+            self.close_file = False
+        else:
+            self.file = open(path, 'w', encoding='utf-8', newline='\n', buffering=buffer_size)
+            self.close_file = True
+        self.encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+
+    def write_all(self, records) -> int:
+        write = self.file.write
+        encode = self.encode
+        count = 0
+        for record in records:
+            write(encode(to_document(record)))
+            write("\n")
+            count += 1
+        return count
+
+    def close(self) -> None:
+        self.file.flush()
+        if self.close_file:
+            self.file.close()
+
+
+class MongoSink(Sink):
+    """
+    Inserts the entries into a MongoDB collection with a MongoBulkWriter.
+    pymongo is imported here, so the other sinks start without it.
+    """
+
+    def __init__(self, uri: str, database_name: str = "LogParser", collection_name: str = "LogEntries",
+                 batch_size: int = 1000):
+        from pymongo import MongoClient
+        from mongo_writer import MongoBulkWriter
+
+        self.client = MongoClient(uri)
+        self.writer = MongoBulkWriter(self.client[database_name][collection_name], batch_size=batch_size)
+
+    def write_all(self, records) -> int:
+        return self.writer.write_all(records)
+
+    def close(self) -> None:
+        self.client.close()
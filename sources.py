@@ -0,0 +1,108 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from split_entries import EntrySplitter
+
+
+class Source:
+    """
+    A folder of error logs produced by one app server.
+    Holds the per-source state that used to be the global CURRENT_FILE_NAME.
+    """
+
+    def __init__(self, folder_path, server_name: str):
+        self.folder_path = Path(folder_path)
+        self.server_name = server_name
+        self.current_file_name = None
+        self.writer = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.pending = False
+        self.file_locks = {}
+        # Filename -> EntrySplitter holding the open trailing entry of the file
+        self.splitters = {}
+        self.recheck_timer = None
+
+    def splitter(self, filename: str, max_entry_size: int | None = None) -> EntrySplitter:
+        """Returns the resumable splitter of one of the source's files."""
+        with self.lock:
+            splitter = self.splitters.get(filename)
+            if splitter is None:
+                splitter = self.splitters[filename] = EntrySplitter(max_entry_size)
+            return splitter
+
+    def file_lock(self, filename: str) -> threading.Lock:
+        """Returns the lock serializing the reads and checkpoint updates of one of the source's files."""
+        with self.lock:
+            return self.file_locks.setdefault(filename, threading.Lock())
+
+    def __repr__(self):
+        return f"Source({str(self.folder_path)!r}, {self.server_name!r})"
+
+
+def load_sources(config_path=None, folder_path=None, server_name: str = "US") -> list[Source]:
+    """
+    Loads the list of sources to ingest.
+
+    Args:
+        config_path (str | None): JSON file listing the sources, e.g.
+                                  [{"folder": "D:/logs/us", "server": "US"}, {"folder": "D:/logs/eu", "server": "EU"}]
+        folder_path (str | None): Single folder used when no config file is given (the FOLDER_PATH setting).
+        server_name (str): Server name of that single folder.
+
+    Returns:
+        list[Source]: The configured sources.
+    """
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        sources = [Source(item["folder"], item["server"]) for item in config]
+    elif folder_path:
+        sources = [Source(folder_path, server_name)]
+    else:
+        sources = []
+
+    server_names = [source.server_name for source in sources]
+    duplicates = {name for name in server_names if server_names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Server names must be unique, found duplicates: {', '.join(sorted(duplicates))}")
+    return sources
+
+
+class SourceScheduler:
+    """
+    Runs process(source) for the sources on a shared worker pool.
+
+    A source is processed by at most one worker at a time, so a slow or huge source only
+    occupies its own worker and never delays the others. Triggers that arrive while a source
+    is being processed are coalesced into a single re-run once it finishes.
+    """
+
+    def __init__(self, process, max_workers: int):
+        self.process = process
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="source")
+
+    def trigger(self, source: Source) -> None:
+        with source.lock:
+            if source.running:
+                source.pending = True
+                return
+            source.running = True
+        self.pool.submit(self._run, source)
+
+    def _run(self, source: Source) -> None:
+        while True:
+            try:
+                self.process(source)
+            except Exception as e:
+                print(f"[{source.server_name}] Error processing {source.folder_path}: {e}")
+            with source.lock:
+                if not source.pending:
+                    source.running = False
+                    return
+                source.pending = False
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=True)
@@ -1,6 +1,11 @@
 import re
 
 
+# Regex to identify the start of a new log entry
+# Example: 2025-01-01 00:41:25.7527 ERROR Guid ...
+# Using a non-greedy match for milliseconds (\.\d+?) and checking for " ERROR Guid"
+log_start_pattern = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+ ERROR Guid")
+
 # Assume log_splitter.py and log_parser.py are available in the same directory
 # or a location included in sys.path.
 # For demonstration, I'll include the necessary functions here.
@@ -31,11 +36,6 @@ def split_entries(log_lines: list[str], start_line_number: int = 0) -> list[str]
         return []
 
 
-    # Regex to identify the start of a new log entry
-    # Example: 2025-01-01 00:41:25.7527 ERROR Guid ...
-    # Using a non-greedy match for milliseconds (\.\d+?) and checking for " ERROR Guid"
-    log_start_pattern = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+ ERROR Guid")
-
     entries = []
     current_entry_lines = []
 
@@ -64,5 +64,133 @@ def split_entries(log_lines: list[str], start_line_number: int = 0) -> list[str]
         entries.append("".join(current_entry_lines))
 
     return entries
-# --- End of log_splitter.py ---
 
+
+def iter_split_entries(log_lines, max_entry_size: int | None = None):
+    """
+    Streaming version of split_entries: yields each log entry as soon as the next one starts.
+
+    Args:
+        log_lines (Iterable[str]): Any iterable of log lines (a list, a LogTail, a generator...).
+                                   Only the lines of the entry being built are held in memory.
+        max_entry_size (int | None): Maximum number of characters kept for a single entry.
+                                     Lines past the cap are dropped (e.g. a huge stack trace)
+                                     and the entry is flagged as truncated. None means no cap.
+
+    Yields:
+        tuple[str, bool]: The entry string and whether it was truncated.
+    """
+    current_entry_lines = []
+    current_entry_size = 0
+    truncated = False
+
+    for line in log_lines:
+        if log_start_pattern.match(line):
+            if current_entry_lines:
+                yield "".join(current_entry_lines), truncated
+
+            current_entry_lines = [line]
+            current_entry_size = len(line)
+            truncated = False
+        elif current_entry_lines:
+            # Lines before the first entry start are ignored, same as split_entries
+            if max_entry_size is not None and current_entry_size + len(line) > max_entry_size:
+                truncated = True
+                continue
+            current_entry_lines.append(line)
+            current_entry_size += len(line)
+
+    if current_entry_lines:
+        yield "".join(current_entry_lines), truncated
+
+
+class EntrySplitter:
+    """
+    Resumable iter_split_entries for the live tail of one file.
+
+    The last entry of a poll may still be being written (a stack trace half flushed), so it is
+    held back instead of being yielded: its lines stay in memory and the next poll resumes
+    reading after them, without reading them again. The checkpoint is the start of that open
+    entry, so after a restart it is read again from there. It is yielded once the next entry
+    starts, or at the end of a final read (the file is done, or has been quiet long enough).
+    """
+
+    def __init__(self, max_entry_size: int | None = None):
+        """
+        Args:
+            max_entry_size (int | None): Maximum number of characters kept for a single entry.
+        """
+        self.max_entry_size = max_entry_size
+        self.reset()
+
+    def reset(self) -> None:
+        """Drops the open entry, e.g. when it was not ingested and is read again from the checkpoint."""
+        self.lines = []
+        self.size = 0
+        self.truncated = False
+        # Line number and byte offset of the start of the open entry, and of the end of its lines read so far
+        self.start_line = self.start_offset = 0
+        self.read_line = self.read_offset = 0
+
+    @property
+    def pending(self) -> bool:
+        """True if an open entry is held back."""
+        return bool(self.lines)
+
+    def resume(self, last_line: int, last_offset: int) -> tuple[int, int]:
+        """
+        Returns the line number and byte offset to read from, given the checkpoint.
+
+        The lines of the open entry are not read again if it starts at the checkpoint; otherwise
+        (another checkpoint, a failed write) it is dropped and the file is read from the checkpoint.
+        """
+        if self.lines and (self.start_line, self.start_offset) == (last_line, last_offset):
+            return self.read_line, self.read_offset
+        self.reset()
+        return last_line, last_offset
+
+    def checkpoint(self, first_line: int, tail) -> tuple[int, int]:
+        """Returns the line number and byte offset up to which all entries were yielded, after reading a tail."""
+        if self.lines:
+            return self.start_line, self.start_offset
+        return first_line + tail.lines_read, tail.offset
+
+    def split(self, tail, first_line: int, final: bool = False, lines=None):
+        """
+        Yields the complete entries of a LogTail, continuing the open entry of the previous read.
+
+        Args:
+            tail (LogTail): The lines to read, starting where resume() said.
+            first_line (int): Line number of the first line of the tail.
+            final (bool): Also yield the last entry instead of holding it back.
+            lines: The lines of the tail when they are wrapped (e.g. timed), pulled from it one at a time
+                   so its offsets match the current line. Defaults to the tail itself.
+
+        Yields:
+            tuple[str, bool]: The entry string and whether it was truncated.
+        """
+        for line in tail if lines is None else lines:
+            if log_start_pattern.match(line):
+                if self.lines:
+                    yield "".join(self.lines), self.truncated
+                self.lines = [line]
+                self.size = len(line)
+                self.truncated = False
+                self.start_line = first_line + tail.lines_read - 1
+                self.start_offset = tail.line_offset
+            elif self.lines:
+                # Lines before the first entry start are ignored, same as split_entries
+                if self.max_entry_size is not None and self.size + len(line) > self.max_entry_size:
+                    self.truncated = True
+                    continue
+                self.lines.append(line)
+                self.size += len(line)
+
+        self.read_line = first_line + tail.lines_read
+        self.read_offset = tail.offset
+        if final and self.lines:
+            entry = "".join(self.lines), self.truncated
+            # Nothing is held back anymore: the checkpoint is the end of the tail
+            self.lines = []
+            yield entry
+# --- End of log_splitter.py ---
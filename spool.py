@@ -0,0 +1,216 @@
+import sqlite3
+import threading
+import uuid
+
+import bson
+
+from log_record import to_document
+
+
+class Spool:
+    """
+    Durable local queue between the parser and MongoDB, in a SQLite file.
+
+    Parsed entries and the new checkpoint of their file are committed to the spool together,
+    so a crash can never separate them. A drainer thread then sends the entries to Mongo with
+    their ErrorCode as _id, which makes a replay after a crash idempotent, and writes each
+    checkpoint to FileInfo once every entry committed before it is acknowledged.
+    The tail only depends on the local disk and keeps its pace while Mongo is slow or down.
+
+    The spooled checkpoints are kept after they are applied: they are the checkpoints the tail
+    resumes from, so it does not need to read FileInfo.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the SQLite file, created if missing.
+        """
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY AUTOINCREMENT, txn TEXT, document BLOB NOT NULL);
+            CREATE INDEX IF NOT EXISTS entries_txn ON entries (txn) WHERE txn IS NOT NULL;
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                server TEXT NOT NULL, filename TEXT NOT NULL, document BLOB NOT NULL,
+                upto INTEGER NOT NULL, version INTEGER NOT NULL, applied INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (server, filename));
+        """)
+        self.lock = threading.Lock()
+        self.committed = threading.Event()
+        with self.lock:
+            # Entries of transactions that were never committed (the process stopped mid-file)
+            self.connection.execute("DELETE FROM entries WHERE txn IS NOT NULL")
+
+    def transaction(self) -> "SpoolTransaction":
+        """Returns a transaction committing entries and a checkpoint together, to be used as a context manager."""
+        return SpoolTransaction(self)
+
+    def get_checkpoint(self, server_name: str, filename: str) -> dict | None:
+        """Returns the last checkpoint committed for a file, as a FileInfo document, or None."""
+        with self.lock:
+            row = self.connection.execute("SELECT document FROM checkpoints WHERE server = ? AND filename = ?",
+                                          (server_name, filename)).fetchone()
+        return bson.decode(row[0]) if row else None
+
+    def set_checkpoint(self, server_name: str, filename: str, document: dict) -> None:
+        """Commits a checkpoint on its own, e.g. a file marked done."""
+        with self.lock:
+            self._write_checkpoint(server_name, filename, document)
+
+    def _write_checkpoint(self, server_name: str, filename: str, document: dict) -> None:
+        # Applied to FileInfo once every entry committed up to now is acknowledged
+        document = {key: value for key, value in document.items() if key != "_id"}
+        self.connection.execute("""
+            INSERT INTO checkpoints (server, filename, document, upto, version)
+            VALUES (?, ?, ?, (SELECT COALESCE(MAX(id), 0) FROM entries), 1)
+            ON CONFLICT (server, filename) DO UPDATE SET
+                document = excluded.document, upto = excluded.upto, version = checkpoints.version + 1
+        """, (server_name, filename, bson.encode(document)))
+        self.committed.set()
+
+    def pending(self) -> int:
+        """Returns the number of committed entries not acknowledged by Mongo yet."""
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries WHERE txn IS NULL").fetchone()[0]
+
+    def drain(self, writer, apply_checkpoint, batch_size: int = 1000) -> int:
+        """
+        Sends the committed entries to Mongo in id order, then applies the checkpoints they cover.
+
+        Args:
+            writer (MongoBulkWriter): Writer the entries are inserted with.
+            apply_checkpoint: Callable (server_name, filename, document) writing a checkpoint to FileInfo.
+            batch_size (int): Number of entries read from the spool at a time.
+
+        Returns:
+            int: The number of entries acknowledged.
+        """
+        acknowledged = 0
+        while True:
+            with self.lock:
+                rows = self.connection.execute("SELECT id, document FROM entries WHERE txn IS NULL ORDER BY id LIMIT ?",
+                                               (batch_size,)).fetchall()
+            if not rows:
+                break
+
+            documents = []
+            for _, blob in rows:
+                document = bson.decode(blob)
+                # Idempotent key: an entry inserted before a crash is recognised as a duplicate
+                document["_id"] = document["ErrorCode"]
+                documents.append(document)
+            try:
+                writer.write_all(documents)
+            except Exception:
+                writer.discard()
+                raise
+
+            # Only the rows that were sent: entries with lower ids may have been committed meanwhile
+            with self.lock:
+                self.connection.execute("BEGIN")
+                try:
+                    self.connection.executemany("DELETE FROM entries WHERE id = ?", [(row[0],) for row in rows])
+                    self.connection.execute("COMMIT")
+                except Exception:
+                    self.connection.execute("ROLLBACK")
+                    raise
+            acknowledged += len(rows)
+
+        with self.lock:
+            checkpoints = self.connection.execute("""
+                SELECT server, filename, document, version FROM checkpoints
+                WHERE applied < version AND NOT EXISTS (SELECT 1 FROM entries WHERE txn IS NULL AND id <= upto)
+            """).fetchall()
+        for server_name, filename, blob, version in checkpoints:
+            apply_checkpoint(server_name, filename, bson.decode(blob))
+            with self.lock:
+                self.connection.execute("UPDATE checkpoints SET applied = ? WHERE server = ? AND filename = ?",
+                                        (version, server_name, filename))
+        return acknowledged
+
+    def start(self, writer, apply_checkpoint, retry_delay: float = 5.0) -> threading.Thread:
+        """Drains the spool in a background thread, as soon as something is committed."""
+        def loop():
+            while True:
+                self.committed.wait(timeout=retry_delay)
+                self.committed.clear()
+                try:
+                    self.drain(writer, apply_checkpoint)
+                except Exception as e:
+                    print(f"Spool: error writing to MongoDB, {self.pending()} entries kept for retry: {e}")
+                    self.committed.clear()
+
+        thread = threading.Thread(target=loop, name="spool-drainer", daemon=True)
+        thread.start()
+        return thread
+
+
+class SpoolTransaction:
+    """
+    Entries written to a spool and the checkpoint of their file, committed together.
+
+    Entries are inserted in small batches, so several sources can spool at the same time,
+    and stay invisible to the drainer until set_checkpoint commits them with the checkpoint.
+    Leaving the context without set_checkpoint, or on an exception, throws them away.
+    """
+
+    def __init__(self, spool: Spool, batch_size: int = 1000):
+        self.spool = spool
+        self.batch_size = batch_size
+        self.txn = uuid.uuid4().hex
+        self.committed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.committed:
+            with self.spool.lock:
+                self.spool.connection.execute("DELETE FROM entries WHERE txn = ?", (self.txn,))
+        return False
+
+    def write_all(self, records) -> int:
+        """
+        Spools every record of an iterable (typically a generator).
+
+        Returns:
+            int: The number of records spooled.
+        """
+        count = 0
+        batch = []
+        for record in records:
+            batch.append((self.txn, bson.encode(to_document(record))))
+            if len(batch) >= self.batch_size:
+                count += self._insert(batch)
+                batch = []
+        if batch:
+            count += self._insert(batch)
+        return count
+
+    def _insert(self, batch: list) -> int:
+        with self.spool.lock:
+            connection = self.spool.connection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany("INSERT INTO entries (txn, document) VALUES (?, ?)", batch)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return len(batch)
+
+    def set_checkpoint(self, server_name: str, filename: str, document: dict) -> None:
+        """Commits the spooled entries and the checkpoint of their file in one SQLite transaction."""
+        with self.spool.lock:
+            connection = self.spool.connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("UPDATE entries SET txn = NULL WHERE txn = ?", (self.txn,))
+                self.spool._write_checkpoint(server_name, filename, document)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        self.committed = True
@@ -0,0 +1,114 @@
+import threading
+
+from fingerprint import fingerprint_stack_trace
+from log_record import FIELDS, to_document
+
+
+# Fields an entry is keyed by, per key kind
+STORM_KEYS = {
+    "route": ("Server", "Controller", "Action", "HTTPStatusCode"),
+    "signature": ("Server", "StackTrace"),
+}
+
+_ATTRIBUTES = dict(FIELDS)
+
+
+def _get(entry, key: str):
+    """Reads a field of a dict or LogRecord entry, without building the document of a LogRecord."""
+    return entry[key] if isinstance(entry, dict) else getattr(entry, _ATTRIBUTES[key])
+
+
+class StormControl:
+    """
+    Samples the entries of a key that goes over a rate, during error storms.
+
+    Entries are keyed by route (Server, Controller, Action, HTTPStatusCode) or by signature
+    (Server and the fingerprint of the normalized stack trace) and counted per time window of
+    their own timestamp, so a backlog is sampled like the live tail was. In each window, the first
+    `limit` entries of a key are kept, then one in every `sample_every`. A kept entry carries
+    "Suppressed": the number of entries of its key dropped since the previous kept one, and the
+    last dropped entry of a key is kept at the end of each stream with the remaining count, so
+    the sum of 1 + Suppressed over the kept entries is the exact number of entries.
+    Keying by signature normalizes every stack trace, which costs about as much as parsing.
+    """
+
+    def __init__(self, limit: int = 100, window_minutes: int = 1, sample_every: int = 100, key: str = "route",
+                 max_keys: int = 10000):
+        """
+        Args:
+            limit (int): Entries of a key kept in full per window.
+            window_minutes (int): Width of a window, in minutes (windows restart at midnight).
+            sample_every (int): Over the limit, one entry in every sample_every is kept, 0 to keep none until the end of the stream.
+            key (str): "route" or "signature".
+            max_keys (int): Keys counted at the same time; the counts are reset when there are more.
+        """
+        if key not in STORM_KEYS:
+            raise ValueError(f"Unknown storm control key: {key}")
+        self.limit = limit
+        self.window_minutes = max(window_minutes, 1)
+        self.sample_every = sample_every
+        self.key = key
+        self.max_keys = max_keys
+        # key -> [window, entries seen in that window]
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def key_of(self, entry) -> tuple:
+        if self.key == "signature":
+            return _get(entry, "Server"), fingerprint_stack_trace(_get(entry, "StackTrace"))
+        return tuple(_get(entry, field) for field in STORM_KEYS["route"])
+
+    def window_of(self, entry):
+        """Returns the window of an entry from its Date and Time ("00:41:25.7527"), None if malformed."""
+        time_of_day = _get(entry, "Time")
+        try:
+            minute = int(time_of_day[:2]) * 60 + int(time_of_day[3:5])
+        except ValueError:
+            return None
+        return _get(entry, "Date"), minute // self.window_minutes
+
+    def _keep(self, key: tuple, window) -> bool:
+        with self.lock:
+            state = self.windows.get(key)
+            if state is None or state[0] != window:
+                if state is None and len(self.windows) >= self.max_keys:
+                    self.windows.clear()
+                state = self.windows[key] = [window, 0]
+            state[1] += 1
+            over = state[1] - self.limit
+        return over <= 0 or (self.sample_every > 0 and over % self.sample_every == 0)
+
+    def filter(self, entries, on_suppressed=None):
+        """
+        Yields the entries to write, in order, then the last dropped entry of each key that has some left.
+
+        Args:
+            entries: Iterable of parsed entries (dicts or LogRecords).
+            on_suppressed: Called with the number of entries dropped, once the stream is done.
+
+        Yields:
+            dict | LogRecord: The kept entries; those standing for dropped entries are dicts with "Suppressed".
+        """
+        # key -> [entries dropped since the last kept one, last dropped entry]
+        pending = {}
+        suppressed = 0
+        for entry in entries:
+            window = self.window_of(entry)
+            key = self.key_of(entry)
+            if window is None or self._keep(key, window):
+                dropped = pending.pop(key, None)
+                if dropped is not None:
+                    entry = {**to_document(entry), "Suppressed": dropped[0]}
+                yield entry
+            else:
+                dropped = pending.setdefault(key, [0, None])
+                dropped[0] += 1
+                dropped[1] = entry
+                suppressed += 1
+
+        for count, entry in pending.values():
+            # The last dropped entry is kept in place of the others
+            yield {**to_document(entry), "Suppressed": count - 1} if count > 1 else entry
+            suppressed -= 1
+        if on_suppressed is not None:
+            on_suppressed(suppressed)
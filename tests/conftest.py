@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The modules are flat at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+class Scheduler:
+    def trigger(self, source):
+        pass
+
+
+@pytest.fixture
+def daemon(monkeypatch):
+    """Sets the globals main.__main__ reads from the environment to a plain serial daemon."""
+    settings = {
+        "client": pytest.importorskip("mongomock").MongoClient(), "DATABASE_NAME": "LogParser",
+        "FILE_COLLECTION": "FileInfo", "LOG_COLLECTION_NAME": "LogEntries", "MAX_ENTRY_SIZE": None, "BATCH_SIZE": 100, "PARSE_WORKERS": 1,
+        "PARALLEL_THRESHOLD": 1 << 30, "WRITE_RETRIES": 0, "COMPACT_RECORDS": False,
+        "TRACE_STORE": None, "ROLLUP": None, "SPOOL": None, "SEARCH_STORE": None, "PIPELINE": None,
+        "STORM_CONTROL": None, "OPEN_ENTRY_TIMEOUT": 1, "METRICS": None, "CHECKPOINT_CACHE": None,
+        "scheduler": Scheduler(),
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(main, name, value, raising=False)
+    return monkeypatch
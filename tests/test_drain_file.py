@@ -0,0 +1,19 @@
+import main
+from sources import Source
+from spool import Spool
+
+
+def test_drain_empty_file_with_spool(daemon, tmp_path):
+    """An empty file has no checkpoint in the spool, it is still marked done."""
+    spool = Spool(str(tmp_path / "spool.db"))
+    daemon.setattr(main, "SPOOL", spool)
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    log_file = logs / "errors_2026-10-16.log"
+    log_file.write_text("")
+
+    main.drain_file(Source(str(logs), "US"), log_file.name, str(log_file))
+
+    checkpoint = spool.get_checkpoint("US", log_file.name)
+    assert checkpoint["Isdone"] is True
+    assert checkpoint["Lastbyteread"] == 0
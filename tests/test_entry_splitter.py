@@ -0,0 +1,79 @@
+import datetime
+import random
+import time
+
+import pytest
+
+import generate_logs
+import main
+from file_handling import LogTail
+from metrics import Metrics
+from pipeline import Pipeline
+from sources import Source
+
+
+class ListWriter:
+    """Collects the written entries; fails every write while `fail` is set."""
+
+    def __init__(self):
+        self.docs = []
+        self.fail = False
+
+    def write_all(self, records):
+        records = list(records)
+        if self.fail:
+            raise RuntimeError("database down")
+        self.docs += records
+        return len(records)
+
+    def discard(self):
+        pass
+
+
+@pytest.mark.parametrize("metrics", [False, True])
+@pytest.mark.parametrize("mode", ["serial", "pipeline", "parallel"])
+def test_entries_cut_at_random_points(daemon, tmp_path, mode, metrics):
+    """Every entry is written once and whole, wherever the polls cut the file, across a failed write and a restart."""
+    if metrics:
+        daemon.setattr(main, "METRICS", Metrics())
+    if mode == "pipeline":
+        daemon.setattr(main, "PIPELINE", Pipeline(2, "thread", 2))
+    elif mode == "parallel":
+        daemon.setattr(main, "PARSE_WORKERS", 2)
+        daemon.setattr(main, "PARALLEL_THRESHOLD", 1)
+
+    log_file = tmp_path / "errors_2026-10-17.log"
+    rnd = random.Random(2)
+    text = "".join(generate_logs.generate_entry(rnd, datetime.datetime(2026, 10, 17, 10, 0, i), 0.5, (20, 30))
+                   for i in range(40))
+    cuts = sorted(random.Random(3).sample(range(1, len(text)), 12)) + [len(text)]
+
+    source = Source(str(tmp_path), "US")
+    source.writer = ListWriter()
+    position = 0
+    try:
+        for poll, cut in enumerate(cuts):
+            with open(log_file, "a", newline="") as f:
+                f.write(text[position:cut])
+            position = cut
+            if poll == 5:
+                source.writer.fail = True
+                with pytest.raises(RuntimeError):
+                    main.main_program(source)
+                source.writer.fail = False
+            if poll == 8:
+                # Restart: the open entry is resumed from the checkpoint
+                writer = source.writer
+                source = Source(str(tmp_path), "US")
+                source.writer = writer
+            main.main_program(source)
+        # The last entry is only written once the file has been quiet for OPEN_ENTRY_TIMEOUT
+        time.sleep(1.3)
+        main.main_program(source)
+    finally:
+        if main.PIPELINE is not None:
+            main.PIPELINE.shutdown()
+
+    expected = list(main.main(LogTail(str(log_file), 0, log_file.stat().st_size), server_name="US"))
+    assert len(expected) == 40
+    assert source.writer.docs == expected
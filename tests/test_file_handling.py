@@ -0,0 +1,66 @@
+import bz2
+import gzip
+import io
+
+import pytest
+
+import file_handling
+from file_handling import COMPRESSED_OPENERS, LogTail, zstd
+
+TEXT = "".join(f"line {i}\r\n" if i % 3 else f"line {i}\n" for i in range(5000))
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress}
+if zstd is not None:
+    COMPRESSORS[".zst"] = zstd.compress
+
+
+def write_archive(tmp_path, extension):
+    path = tmp_path / f"errors_2026-10-17.log{extension}"
+    path.write_bytes(COMPRESSORS[extension](TEXT.encode("utf-8")))
+    return str(path)
+
+
+def expected_lines(offset):
+    return TEXT.encode("utf-8")[offset:].decode("utf-8").replace("\r\n", "\n").splitlines(keepends=True)
+
+
+@pytest.mark.parametrize("extension", [".gz", ".bz2", ".zst"])
+def test_archive_round_trip(tmp_path, extension):
+    if extension not in COMPRESSED_OPENERS:
+        pytest.skip(f"no {extension} backend")
+    path = write_archive(tmp_path, extension)
+    # TEXT is ASCII, so character and byte offsets are the same
+    middle = TEXT.index("line", len(TEXT) // 2)
+
+    for offset in (0, middle):
+        tail = LogTail(path, offset, 1 << 62)
+        assert list(tail) == expected_lines(offset)
+        assert tail.offset == len(TEXT)
+
+
+class Unseekable(io.RawIOBase):
+    """A decompressing stream that can't seek, like the zstandard stream reader."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def test_unseekable_archive_skips_to_offset(tmp_path, monkeypatch):
+    monkeypatch.setitem(file_handling.COMPRESSED_OPENERS, ".gz",
+                        lambda path, mode: io.BufferedReader(Unseekable(gzip.open(path, mode))))
+    path = write_archive(tmp_path, ".gz")
+    offset = TEXT.index("line 4000")
+
+    assert list(LogTail(path, offset, 1 << 62)) == expected_lines(offset)
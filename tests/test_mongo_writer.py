@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from mongo_writer import MongoBulkWriter
+from search_store import SearchStore
+
+
+class ListCollection:
+    """Stands in for a pymongo collection, keeping the documents of each bulk write."""
+
+    def __init__(self):
+        self.documents = []
+
+    def bulk_write(self, requests, ordered=True):
+        self.documents += [request._doc for request in requests]
+
+
+class LockedSearchStore:
+    def write_all(self, records):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def entry(code):
+    return {"ErrorCode": code, "Server": "US", "ServerDateTime": "2026-10-17 10:00:00.0000", "StackTrace": "at A()"}
+
+
+def test_locked_search_store_does_not_fail_the_batch(capsys):
+    collection = ListCollection()
+    writer = MongoBulkWriter(collection, batch_size=2, search_store=LockedSearchStore())
+
+    assert writer.write_all([entry("a"), entry("b"), entry("c")]) == 3
+    assert [document["ErrorCode"] for document in collection.documents] == ["a", "b", "c"]
+    assert "database is locked" in capsys.readouterr().out
+
+
+class FailingCollection:
+    def bulk_write(self, requests, ordered=True):
+        raise RuntimeError("down")
+
+
+def test_search_store_gets_only_written_batches(tmp_path):
+    store = SearchStore(str(tmp_path / "search.db"))
+    writer = MongoBulkWriter(FailingCollection(), search_store=store)
+
+    with pytest.raises(RuntimeError):
+        writer.write_all([entry("a")])
+    assert store.search() == []
+
+    writer = MongoBulkWriter(ListCollection(), search_store=store)
+    writer.write_all([entry("a")])
+    assert [document["ErrorCode"] for document in store.search()] == ["a"]
@@ -0,0 +1,21 @@
+import datetime
+import random
+
+import generate_logs
+import main
+from file_handling import LogTail
+from search_store import SearchStore
+
+
+def test_since_accepts_iso_separator(tmp_path):
+    rnd = random.Random(1)
+    log_file = tmp_path / "errors_2026-10-17.log"
+    log_file.write_text("".join(generate_logs.generate_entry(rnd, datetime.datetime(2026, 10, 17, 10 + i, 0, 0), 0.0,
+                                                             (5, 10)) for i in range(4)))
+    entries = list(main.main(LogTail(str(log_file), 0, log_file.stat().st_size), server_name="US"))
+    store = SearchStore(str(tmp_path / "search.db"))
+    store.write_all(entries)
+
+    spaced = store.search(since="2026-10-17 12:00", until="2026-10-17 13:30")
+    assert [entry["ServerDateTime"] for entry in spaced] == [entries[3]["ServerDateTime"], entries[2]["ServerDateTime"]]
+    assert store.search(since="2026-10-17T12:00", until="2026-10-17T13:30") == spaced
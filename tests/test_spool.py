@@ -0,0 +1,48 @@
+from spool import Spool
+
+
+def entry(code):
+    return {"ErrorCode": code, "Server": "US"}
+
+
+class CommittingWriter:
+    """Inserts the entries; commits a pending transaction during the first write, as another source would."""
+
+    def __init__(self, on_first_write):
+        self.docs = []
+        self.on_first_write = on_first_write
+
+    def write_all(self, records):
+        if self.on_first_write is not None:
+            self.on_first_write()
+            self.on_first_write = None
+        self.docs += records
+        return len(records)
+
+    def discard(self):
+        pass
+
+
+def test_drain_keeps_entries_committed_during_a_write(tmp_path):
+    spool = Spool(str(tmp_path / "spool.db"))
+    applied = {}
+
+    # Source A spools first but commits last
+    source_a = spool.transaction()
+    source_a.write_all([entry(f"a{i}") for i in range(5)])
+    with spool.transaction() as source_b:
+        source_b.write_all([entry(f"b{i}") for i in range(3)])
+        source_b.set_checkpoint("US", "b.log", {"Lastbyteread": 30})
+
+    def commit_a():
+        with source_a:
+            source_a.set_checkpoint("US", "a.log", {"Lastbyteread": 50})
+
+    writer = CommittingWriter(commit_a)
+    acknowledged = spool.drain(writer, lambda server, filename, document: applied.update({filename: document}))
+
+    assert acknowledged == 8
+    assert sorted(document["ErrorCode"] for document in writer.docs) == sorted(
+        [f"a{i}" for i in range(5)] + [f"b{i}" for i in range(3)])
+    assert spool.pending() == 0
+    assert applied == {"a.log": {"Lastbyteread": 50}, "b.log": {"Lastbyteread": 30}}
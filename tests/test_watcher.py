@@ -0,0 +1,32 @@
+import sys
+import threading
+
+import pytest
+
+from watcher import InotifyWatcher, PollingWatcher
+
+
+def make_watcher(kind, folder):
+    if kind == "inotify":
+        if not sys.platform.startswith("linux"):
+            pytest.skip("inotify is Linux only")
+        return InotifyWatcher(folder)
+    return PollingWatcher(folder, poll_interval=0.05)
+
+
+@pytest.mark.parametrize("kind", ["inotify", "polling"])
+def test_other_files_are_not_changes(tmp_path, kind):
+    watcher = make_watcher(kind, tmp_path)
+    try:
+        (tmp_path / "notes.txt").write_text("not a log")
+        assert watcher.wait(0.3) == set()
+
+        # Without a timeout, the wait goes on past other files until a log file changes
+        def write():
+            (tmp_path / "other.txt").write_text("still not a log")
+            (tmp_path / "errors_2026-10-17.log").write_text("ERROR\n")
+
+        threading.Timer(0.2, write).start()
+        assert watcher.wait() == {"errors_2026-10-17.log"}
+    finally:
+        watcher.close()
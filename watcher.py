@@ -0,0 +1,163 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from file_handling import error_log_pattern
+
+
+# inotify event masks (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """
+    Watches a folder for created or modified error log files using Linux inotify.
+    Waiting blocks on the inotify file descriptor, so an idle folder costs no CPU.
+    """
+
+    def __init__(self, folder_path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(folder_path)), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder_path}")
+
+    def wait(self, timeout=None) -> set[str]:
+        """
+        Blocks until an error log file changes or the timeout (in seconds) expires.
+
+        Returns:
+            set[str]: Names of the error log files that changed, empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        # Events of other files in the folder are read and skipped until one of a log file comes
+        while not changed:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                break
+
+            data = os.read(self.fd, 65536)
+            offset = 0
+            while offset < len(data):
+                _, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + name_length].rstrip(b"\0").decode("utf-8", errors="replace")
+                offset += name_length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: let the caller look at everything
+                    changed.add("")
+                elif error_log_pattern.match(name):
+                    changed.add(name)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Portable fallback: detects created or modified error log files by comparing
+    their size and mtime every poll_interval seconds.
+    """
+
+    def __init__(self, folder_path, poll_interval: float = 1.0):
+        self.folder_path = folder_path
+        self.poll_interval = poll_interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        try:
+            with os.scandir(self.folder_path) as entries:
+                for entry in entries:
+                    if error_log_pattern.match(entry.name):
+                        st = entry.stat()
+                        snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError as e:
+            print(f"Error scanning folder {self.folder_path}: {e}")
+        return snapshot
+
+    def wait(self, timeout=None) -> set[str]:
+        """
+        Blocks until an error log file changes or the timeout (in seconds) expires.
+
+        Returns:
+            set[str]: Names of the error log files that changed, empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {name for name, stat in snapshot.items() if self.snapshot.get(name) != stat}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            sleep_for = self.poll_interval
+            if deadline is not None:
+                sleep_for = min(sleep_for, max(0.0, deadline - time.monotonic()))
+            time.sleep(sleep_for)
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(folder_path, mode: str = "auto", poll_interval: float = 1.0):
+    """
+    Returns an inotify watcher when available ("auto" or "inotify"), otherwise a polling watcher.
+    """
+    if mode in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder_path)
+        except (OSError, AttributeError) as e:
+            if mode == "inotify":
+                raise
+            print(f"inotify is not available ({e}), falling back to polling.")
+    return PollingWatcher(folder_path, poll_interval)
+
+
+def watch_folder(folder_path, on_change, mode: str = "auto", debounce: float = 0.5,
+                 max_delay: float = 5.0, poll_interval: float = 1.0) -> None:
+    """
+    Calls on_change(changed_file_names) whenever error log files in the folder are created
+    or modified. Runs forever.
+
+    Bursts of writes are debounced: after the first event, further events are collected until
+    the folder has been quiet for `debounce` seconds, or `max_delay` seconds have passed so a
+    file that is written continuously is still processed regularly.
+    """
+    watcher = create_watcher(folder_path, mode, poll_interval)
+    try:
+        while True:
+            changed = watcher.wait()
+            started = time.monotonic()
+            while True:
+                remaining = max_delay - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+                more = watcher.wait(min(debounce, remaining))
+                if not more:
+                    break
+                changed |= more
+            if changed:
+                on_change(changed)
+    finally:
+        watcher.close()